@@ -0,0 +1,48 @@
+"""
+Synthetic PDF corpora for the benchmarks
+"""
+import os
+import sys
+import random
+
+# the PDF writer is shared with the tests
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'tests'))
+from pdfs import make_pdf  # noqa: E402
+
+WORDS = ("lorem ipsum dolor sit amet consetetur sadipscing elitr sed diam nonumy eirmod tempor "
+         "invidunt ut labore et dolore magna aliquyam erat voluptua vero eos accusam justo duo "
+         "dolores ea rebum stet clita kasd gubergren sea takimata sanctus est").split()
+
+
+def sentence(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 16))).capitalize() + "."
+
+
+def make_corpus(directory, files=10, pages=5, lines=30, annots=2, seed=0):
+    """
+    Write a reproducible corpus of PDF files
+
+    :param      directory:  The directory to write to
+    :type       directory:  str
+    :param      files:      The number of files
+    :type       files:      int
+    :param      pages:      The number of pages per file
+    :type       pages:      int
+    :param      lines:      The number of sentences per page
+    :type       lines:      int
+    :param      annots:     The number of annotations per page
+    :type       annots:     int
+    :param      seed:       The random seed
+    :type       seed:       int
+
+    :returns:   The paths of the files
+    :rtype:     List[str]
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    return [make_pdf(os.path.join(directory, f'doc{i:05d}.pdf'),
+                     pages=[[sentence(rng) for _ in range(lines)] for _ in range(pages)],
+                     annots=[[sentence(rng) for _ in range(annots)] for _ in range(pages)],
+                     metadata={'Author': f'Author {rng.randint(0, 20)}', 'Title': sentence(rng),
+                               'Producer': 'all-seeing-eye benchmarks'})
+            for i in range(files)]
@@ -0,0 +1,65 @@
+"""
+Measure the startup time of the ase command line
+
+    python benchmarks/startup.py [--runs N]
+
+Every run is a fresh interpreter. HOME points to a temporary directory, such
+that the cold query starts without config and caches.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+from corpus import make_corpus
+
+HEAVY = ['pdfplumber', 'fitz', 'PyPDF2', 'nltk', 'wordsegment', 'fuzzywuzzy', 'rapidfuzz',
+         'tqdm', 'rich', 'sqlite3', 'multiprocessing', 'socketserver', 'ctypes']
+
+
+def timed(argv, env, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(argv, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def imported(args, env):
+    """
+    Return the heavy modules imported by a run of ase with args
+    """
+    code = ("import sys, json, all_seeing_eye.ase as ase; ase.main(sys.argv[1:]); "
+            f"print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))")
+    out = subprocess.run([sys.executable, '-c', code] + args, env=env, check=True,
+                         capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as home:
+        env = {**os.environ, 'HOME': home}
+        corpus = os.path.join(home, 'corpus')
+        make_corpus(corpus, files=5)
+        cases = {
+            'ase --help': ['--help'],
+            'cold metadata query': ['ipsum', '-d', corpus],
+            'cold contents query': ['ipsum', '-d', corpus, '-c'],
+        }
+        for (name, case) in cases.items():
+            times = timed([sys.executable, '-m', 'all_seeing_eye.ase'] + case, env, args.runs)
+            modules = imported(case, env) if case != ['--help'] else []
+            print(f"{name:<22} min {min(times)*1000:7.1f} ms  median {statistics.median(times)*1000:7.1f} ms  "
+                  f"imports {', '.join(modules) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""
+Benchmark the hot paths of ase on a synthetic corpus
+
+    python benchmarks/suite.py [--files N] [--pages N] [--save FILE] [--baseline FILE]
+
+Every stage is timed on its own (best of --repeat runs) and its peak Python
+memory is measured with tracemalloc in an extra run. With --baseline, the
+results are compared to a file written by --save and the exit code is 1 if a
+stage got slower or bigger by more than --tolerance.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+from typing import Any, Callable, Dict, List
+from corpus import make_corpus
+
+PDF = ['pdfplumber', 'fitz', 'PyPDF2']
+TOKENIZER = ['tokenize', 'regex', 'default_tokenizer']
+SEGMENTIZER = ['wordsegment', 'default_segmentizer']
+MATCHER = ['fuzzywuzzy', 'rapidfuzz', 'default_matcher']
+QUERY = 'dolore magna aliquyam'
+# measurements below are too noisy to flag regressions
+NOISE = {'seconds': 0.001, 'peak': 1 << 16}
+
+
+def measure(run: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'seconds': min(times), 'peak': peak}
+
+
+def plugin(base, kind: str, name: str):
+    return base.get_class(f'all_seeing_eye.plugins.{kind}.{name}')()
+
+
+class Suite:
+
+    def __init__(self, args, directory: str):
+        self.args = args
+        self.directory = directory
+        self.files = make_corpus(os.path.join(directory, 'corpus'), files=args.files, pages=args.pages,
+                                 lines=args.lines, annots=args.annots)
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def run(self, name: str, setup: Callable[[], Callable[[], Any]]):
+        """
+        Measure the function returned by setup, a failing setup (e.g. a
+        missing library) skips the stage
+        """
+        try:
+            stage = setup()
+        except Exception as e:
+            reason = next((line.strip() for line in str(e).splitlines() if any(c.isalnum() for c in line)), '')
+            self.results[name] = {'skipped': f'{e.__class__.__name__}: {reason}'}
+        else:
+            self.results[name] = measure(stage, self.args.repeat)
+        print(self.format(name, self.results[name]), flush=True)
+
+    @staticmethod
+    def format(name: str, result: Dict[str, Any]) -> str:
+        if 'skipped' in result:
+            return f'{name:<40} skipped ({result["skipped"]})'
+        return f'{name:<40} {result["seconds"]*1000:10.1f} ms {result["peak"]/2**20:9.2f} MiB'
+
+    def pages(self) -> List[str]:
+        from all_seeing_eye.plugins.pdf.pdf import Pdf
+        pdf = plugin(Pdf, 'pdf', 'pdfplumber')
+        texts = []
+        for path in self.files:
+            pdf.open(path)
+            texts += [pdf.get_page_text(page) for page in pdf.pages]
+            pdf.close()
+        return texts
+
+    def stages(self):
+        from all_seeing_eye.lib.app import Item
+        from all_seeing_eye.lib.columns import Columns
+        from all_seeing_eye.lib.normalize import normalize
+        from all_seeing_eye.plugins.pdf.pdf import Pdf
+        from all_seeing_eye.plugins.tokenizer.tokenizer import Tokenizer
+        from all_seeing_eye.plugins.segmentizer.segmentizer import Segmentizer
+        from all_seeing_eye.plugins.matcher.matcher import Matcher
+
+        for name in PDF:
+            def text(name=name):
+                pdf = plugin(Pdf, 'pdf', name)
+
+                def run():
+                    for path in self.files:
+                        pdf.open(path)
+                        for page in pdf.pages:
+                            pdf.get_page_text(page)
+                        pdf.close()
+                return run
+            self.run(f'Pdf.get_page_text[{name}]', text)
+
+        pages = self.pages()
+        sentences = [s for page in pages for s in page.split('.') if s.strip()]
+        for name in TOKENIZER:
+            def tokenize(name=name):
+                tokenizer = plugin(Tokenizer, 'tokenizer', name)
+                tokenizer.tokenize(pages[0])
+                return lambda: [tokenizer.tokenize(page) for page in pages]
+            self.run(f'Tokenizer.tokenize[{name}]', tokenize)
+
+            def tokenize_many(name=name):
+                tokenizer = plugin(Tokenizer, 'tokenizer', name)
+                tokenizer.tokenize(pages[0])
+                return lambda: tokenizer.tokenize_many(pages)
+            self.run(f'Tokenizer.tokenize_many[{name}]', tokenize_many)
+
+        for name in SEGMENTIZER:
+            def segment(name=name):
+                segmentizer = plugin(Segmentizer, 'segmentizer', name)
+                sample = sentences[:self.args.segment_sample]
+                return lambda: [segmentizer.segment(s) for s in sample]
+            self.run(f'Segmentizer.segment[{name}]', segment)
+
+        for name in MATCHER:
+            def score(name=name):
+                matcher = plugin(Matcher, 'matcher', name)
+                return lambda: [matcher.score(s, QUERY) for s in sentences]
+            self.run(f'Matcher.score[{name}]', score)
+
+            def score_batch(name=name):
+                matcher = plugin(Matcher, 'matcher', name)
+                return lambda: matcher.score_batch(sentences, QUERY, 70)
+            self.run(f'Matcher.score_batch[{name}]', score_batch)
+
+        # the search form is normalized as by PdfDocument, such that the cache
+        # stores and loads both texts like a real chunk
+        items = [Item(self.files[0], 'Contents of page 1/1', {'display': s, 'search': normalize(s)}) for s in sentences]
+        fname = os.path.join(self.directory, 'columns.cache')
+        self.run('cache store', lambda: lambda: Columns.dump(items, fname))
+        self.run('cache load', lambda: lambda: list(Columns(fname, self.files[0])))
+
+        self.run('main() cold cache, -c', lambda: lambda: self.main(['-c', '-r'], cold=True))
+        self.run('main() warm cache, -c', lambda: lambda: self.main(['-c']))
+        self.run('main() metadata', lambda: lambda: self.main([]))
+
+    def main(self, options: List[str], cold: bool = False):
+        from all_seeing_eye import ase
+        home = os.path.join(self.directory, 'home')
+        cache_dir = os.path.join(home, '.cache', 'ase')
+        if cold and os.path.isdir(cache_dir):
+            import shutil
+            shutil.rmtree(cache_dir)
+        old_home = os.environ.get('HOME')
+        os.environ['HOME'] = home
+        try:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+                ase.main([QUERY, '-d', os.path.join(self.directory, 'corpus'), '--config',
+                          os.path.join(self.directory, 'config.json')] + options)
+        finally:
+            if old_home is None:
+                del os.environ['HOME']
+            else:
+                os.environ['HOME'] = old_home
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> bool:
+    """
+    Print the stages that regressed against the baseline
+
+    :returns:   True if no stage regressed
+    """
+    ok = True
+    for (name, result) in results.items():
+        base = baseline.get(name, {})
+        for key in ('seconds', 'peak'):
+            if key in result and base.get(key, 0) >= NOISE[key]:
+                ratio = result[key] / base[key]
+                if ratio > 1 + tolerance:
+                    ok = False
+                    print(f'REGRESSION {name}: {key} {ratio:.2f}x of baseline')
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=20, help='number of PDF files')
+    parser.add_argument('--pages', type=int, default=10, help='pages per file')
+    parser.add_argument('--lines', type=int, default=30, help='sentences per page')
+    parser.add_argument('--annots', type=int, default=2, help='annotations per page')
+    parser.add_argument('--segment-sample', type=int, default=200, help='sentences to segmentize')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per stage, the best is reported')
+    parser.add_argument('--save', type=str, help='write the results as JSON to this file')
+    parser.add_argument('--baseline', type=str, help='compare to the results in this file')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        suite = Suite(args, directory)
+        suite.stages()
+
+    report = {'corpus': {k: getattr(args, k) for k in ('files', 'pages', 'lines', 'annots')},
+              'python': sys.version.split()[0], 'stages': suite.results}
+    if args.save:
+        with open(args.save, 'w') as handle:
+            json.dump(report, handle, indent=4)
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        if baseline.get('corpus') != report['corpus']:
+            print(f'warning: the baseline was measured on another corpus: {baseline.get("corpus")}')
+        sys.exit(0 if compare(suite.results, baseline['stages'], args.tolerance) else 1)
+
+
+if __name__ == '__main__':
+    main()
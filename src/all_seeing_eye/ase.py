@@ -1,14 +1,28 @@
 #!/usr/bin/env python3
 
 import argparse
+import json
 import os
-import pickle
-import hashlib
-from dataclasses import dataclass, field
-from typing import List, Iterator
-from itertools import chain
-from abc import ABC, abstractmethod
-from all_seeing_eye.lib.app import App, SearchConfig, Item, Match
+import sys
+import shutil
+import threading
+from dataclasses import dataclass, field, asdict
+from typing import List, Generator, Iterator, Iterable, Dict, Any, Optional, Sequence, Set, Tuple, Callable, cast, TYPE_CHECKING
+from itertools import islice, groupby
+from operator import attrgetter
+from contextlib import closing, nullcontext
+from functools import partial
+from collections import deque
+from all_seeing_eye.lib.app import App, SearchConfig, Item, Match, Results
+from all_seeing_eye.lib.columns import ColumnsWriter
+from all_seeing_eye.lib.normalize import normalize
+from all_seeing_eye.lib.profile import Profile
+from all_seeing_eye.plugins.pdf.pdf import Pdf
+from all_seeing_eye.plugins.plugins import entry_points
+
+# the modules of the subcommands are imported when the command is run
+if TYPE_CHECKING:
+    from all_seeing_eye.lib.index import Index
 
 
 @dataclass
@@ -18,8 +32,8 @@ class FileIterator:
 
     def segment(self, word, segmentize):
         if segmentize:
-            word = self.config.segmentizer.segment(word)
-        return {'display': word, 'search': word}
+            word = self.config.segments.segment(word)
+        return {'display': word, 'search': normalize(word)}
 
 
 @dataclass
@@ -32,112 +46,223 @@ class FileInfo(FileIterator):
             Item(self.path, "Dirname", self.segment(os.path.dirname(self.path), False)),
             Item(self.path, "Filename", {
                 'display': os.path.basename(self.path),
-                'search': os.path.basename(self.path)
+                'search': normalize(os.path.basename(self.path))
             }),
         ])
 
 
 @dataclass
-class PdfMeta(FileIterator):
-    """
-    This class describes the iterator for PDF metadata
+class PdfDocument(FileIterator):
     """
-    def __iter__(self):
-        self.config.pdf.open(self.path)
-        return iter(Item(self.path, "Metadata", self.segment(v, self.config.segmentize))
-                    for (k, v) in self.config.pdf.metadata)
+    This class describes the single extraction pass over a PDF file. The
+    document is opened once and its metadata and the text and annotations of
+    every page are read from the same handle.
 
-    def __del__(self):
-        self.config.pdf.close()
+    The pages are extracted and cached in chunks of config.chunk_pages pages
+    in config.store, the metadata is a chunk of its own. A chunk is cached only once all its
+    items were extracted, so an interrupted run resumes with the first
+    missing chunk. start and stop select a range of pages, start should be a
+    multiple of chunk_pages; the metadata belongs to the range starting at 0.
 
+    The document is closed when the context is left:
 
-@dataclass
-class PdfIterator(ABC, FileIterator):
-    iter_items: List[Item] = field(default_factory=list)
-    from_memory: bool = field(default=False)
+        with PdfDocument(path, config) as document:
+            items = list(document)
+    """
+    start: int = 0
+    stop: Optional[int] = None
+    num_pages: Optional[int] = field(default=None, init=False)
+    key: Optional[str] = field(default=None, init=False, repr=False)
+    stored: Set[str] = field(default_factory=set, init=False, repr=False)
+    pdf: Optional[Pdf] = field(default=None, init=False, repr=False)
+
+    # cache directories of the former per-kind iterators
+    obsolete_caches = ('PdfCont', 'PdfAnnots')
 
     def __post_init__(self):
-        hash_args = [
-            __class__.__name__,
-            self.path,
-            self.config.segmentize,
-            self.config.tokenize,
-            self.config.contents
-        ]
-        hash = hashlib.md5(str(hash_args).encode()).hexdigest()
-        self.cache_fname = f'{self.config.cache_dir}/{self.__class__.__name__}/{hash}.cache'
-
-        self.config.pdf.open(self.path)
-        if not self.config.reindex:
-            self.load()
-
-    def __del__(self):
-        self.config.pdf.close()
-        self.store()
+        if self.config.store is not None:
+            self.key = f'{self.config.digests.digest(self.path)}-{self.config.extraction_hash}'
+            self.stored = self.config.store.names(self.key)
+            # the metadata chunk is named after the number of pages
+            for name in self.stored:
+                if name.startswith('meta-'):
+                    self.num_pages = int(name[len('meta-'):])
 
-    def __iter__(self) -> Iterator[Item]:
-        if self.from_memory:
-            return iter(self.iter_items)
-        else:
-            return filter(lambda x: x is not None,
-                          (self.factory(Item,
-                                        path=self.path,
-                                        where=self.get_metainfo(page),
-                                        term=self.segment(item, self.config.segmentize))
-                           for page in self.config.pdf.pages for item in self.get_items_on_page(page)))
-
-    def factory(self, object, *args, **kwargs):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def open(self) -> Pdf:
+        """
+        Open the document with the configured PDF plugin, or with the
+        fallback plugin if the configured one cannot read it
+        """
+        if self.pdf is None:
+            try:
+                self.config.pdf.open(self.path)
+                self.pdf = self.config.pdf
+            except Exception:
+                if self.config.fallback_pdf is None:
+                    raise
+                self.config.fallback_pdf.open(self.path)
+                self.pdf = self.config.fallback_pdf
+            self.num_pages = self.pdf.num_pages
+        return self.pdf
+
+    def read(self, extract: Callable[[Pdf], List[Any]]) -> List[Any]:
+        """
+        Return what extract reads from the open document. If the configured
+        PDF plugin fails to read it, the document is opened again with the
+        fallback plugin, which reads the rest of the document as well.
+        """
+        pdf = self.open()
         try:
-            o = object(*args, **kwargs)
-            self.iter_items.append(o)
-            return o
-        except UnicodeDecodeError:
-            return None
-
-    def load(self):
-        if self.config.cache_dir is not None:
-            os.makedirs(os.path.dirname(self.cache_fname), exist_ok=True)
-            if os.path.exists(self.cache_fname):
-                with open(self.cache_fname, 'rb') as handle:
-                    self.iter_items = pickle.load(handle)
-                    self.from_memory = True
-
-    def store(self):
-        if self.config.cache_dir is not None and not self.from_memory:
-            os.makedirs(os.path.dirname(self.cache_fname), exist_ok=True)
-            with open(self.cache_fname, 'wb') as handle:
-                pickle.dump(self.iter_items, handle, protocol=pickle.HIGHEST_PROTOCOL)
-
-    @abstractmethod
-    def get_items_on_page(self, page) -> List[str]:
-        pass
+            return extract(pdf)
+        except Exception:
+            fallback = self.config.fallback_pdf
+            if fallback is None or pdf is fallback:
+                raise
+        self.close()
+        fallback.open(self.path)
+        self.pdf = fallback
+        return extract(fallback)
 
-    @abstractmethod
-    def get_metainfo(self, page) -> str:
-        pass
+    def close(self):
+        if self.pdf is not None:
+            self.pdf.close()
+            self.pdf = None
 
+    @property
+    def pages(self) -> int:
+        if self.num_pages is None:
+            self.open()
+        return cast(int, self.num_pages)
 
-class PdfCont(PdfIterator):
-    """
-    This class describes the iterator for contents of PDF files
-    """
-    def get_items_on_page(self, page):
-        return self.config.tokenizer.tokenize(self.config.pdf.get_page_text(page))
+    @property
+    def chunks(self) -> List[Tuple[int, int]]:
+        """
+        The page ranges of the chunks of this document
+        """
+        size = self.config.chunk_pages
+        stop = self.pages if self.stop is None else min(self.stop, self.pages)
+        return [(start, min(start + size, stop)) for start in range(self.start, stop, size)]
 
-    def get_metainfo(self, page):
-        return f"Contents of page {self.config.pdf.get_page_nr(page)}/{self.config.pdf.num_pages}"
+    @property
+    def cached(self) -> bool:
+        """
+        Whether all chunks of this document are cached, such that iterating
+        it does not read the PDF file
+        """
+        if self.key is None or self.num_pages is None:
+            return False
+        names = {f'{start}-{stop}' for (start, stop) in self.chunks} if self.config.contents else set()
+        if self.start == 0:
+            names.add(f'meta-{self.num_pages}')
+        return names <= self.stored
 
+    def __iter__(self) -> Iterator[Item]:
+        if self.start == 0:
+            yield from self.chunk(f'meta-{self.pages}', self.extract_metadata)
+        if self.config.contents:
+            for (start, stop) in self.chunks:
+                yield from self.chunk(f'{start}-{stop}', partial(self.extract_pages, start, stop))
 
-# todo: segmentize=False only here
-class PdfAnnots(PdfIterator):
-    """
-    This class describes the iterator for annotations of PDF files
-    """
-    def get_items_on_page(self, page):
-        return self.config.pdf.get_page_annots(page)
+    def chunk(self, name: str, extract: Callable[[], Iterator[Item]]) -> Iterator[Item]:
+        """
+        Yield the items of a chunk from the store, or extract them and write
+        them while they are extracted. The chunk is saved once all items were
+        extracted.
+        """
+        (store, stats) = (self.config.store, self.config.stats)
+        if store is None or self.key is None:
+            yield from extract()
+            return
+        if name in self.stored:
+            # the cache is keyed on contents, the file may have been moved
+            columns = store.load(self.key, name, self.path)
+            if columns is not None:
+                if stats is not None:
+                    stats.cache('chunks', True)
+                try:
+                    yield from columns if stats is None else stats.iterate('PdfDocument.load', iter(columns))
+                finally:
+                    columns.close()
+                return
+
+        if stats is not None:
+            stats.cache('chunks', False)
+        # the items are written while they are extracted, not kept until the
+        # chunk is done; the writer is discarded if the chunk is not finished
+        fname = store.temp_name(self.key, name)
+        writer = ColumnsWriter(fname)
+        items = extract()
+        try:
+            for item in items:
+                writer.append(item)
+                yield item
+        except GeneratorExit:
+            # stopped early, e.g. by --break: the text of the chunk is read
+            # already, so the rest of its items is extracted to cache it
+            try:
+                for item in items:
+                    writer.append(item)
+            except Exception:
+                writer.discard()
+                return
+            self.save(name, fname, writer)
+            return
+        except BaseException:
+            writer.discard()
+            raise
+        self.save(name, fname, writer)
+
+    def save(self, name: str, fname: str, writer: ColumnsWriter):
+        """
+        Store the chunk written to fname
+        """
+        (store, key) = (self.config.store, self.key)
+        assert store is not None and key is not None
+        with nullcontext() if self.config.stats is None else self.config.stats.timed('PdfDocument.store'):
+            # a chunk is complete or absent, also if the run is killed
+            writer.close()
+            store.save(key, name, fname)
+        self.stored.add(name)
+
+    def extract_metadata(self) -> Iterator[Item]:
+        for (k, v) in self.read(lambda pdf: list(pdf.metadata)):
+            yield self.item("Metadata", v)
 
-    def get_metainfo(self, page):
-        return f"Annotations of page {self.config.pdf.get_page_nr(page)}/{self.config.pdf.num_pages}"
+    def extract_pages(self, start: int, stop: int) -> Iterator[Item]:
+        # the pages of a chunk are tokenized in one call
+        pages = self.read(lambda pdf: list(pdf.get_pages_content(start, stop)))
+        for ((page_nr, _, annots), sentences) in zip(pages, self.config.tokenizer.tokenize_many(text for (_, text, _) in pages)):
+            nr = f"page {page_nr}/{self.pages}"
+            for sentence in sentences:
+                yield self.item(f"Contents of {nr}", sentence)
+            # todo: segmentize=False only here
+            for annot in annots:
+                yield self.item(f"Annotations of {nr}", annot)
+
+    def item(self, where: str, text: str) -> Item:
+        return Item(self.path, where, self.segment(text, self.config.segmentize))
+
+    @classmethod
+    def collect_garbage(cls, config: SearchConfig):
+        """
+        Remove the cache files of deleted files and of outdated versions of
+        changed files
+
+        :param      config:  The search config
+        :type       config:  SearchConfig
+        """
+        if config.store is None:
+            return
+        config.store.collect_garbage(config.digests.collect_garbage())
+        for name in cls.obsolete_caches:
+            if os.path.isdir(f'{config.cache_dir}/{name}'):
+                shutil.rmtree(f'{config.cache_dir}/{name}')
 
 
 @dataclass
@@ -145,52 +270,835 @@ class PdfSegments(FileIterator):
     """
     This class describes the iterator that splits a PDF document into its
     sentences, annotations, metadata, ...
+
+    The document is closed when the iteration ends or the iterator is closed.
     """
-    def __iter__(self):
-        return chain(
-            FileInfo(self.path, self.config),
-            PdfMeta(self.path, self.config),
-            iter(PdfCont(self.path, self.config)) if self.config.contents else iter([]),
-            iter(PdfAnnots(self.path, self.config)) if self.config.contents else iter([]),
-        )
+    start: int = 0
+    stop: Optional[int] = None
+    document: Optional[PdfDocument] = field(default=None, init=False, repr=False)
 
+    def __iter__(self) -> Generator[Item, None, None]:
+        items = self.items()
+        # the time spent extracting, while the caller scores is not counted
+        return items if self.config.stats is None else self.config.stats.iterate('PdfSegments', items, self.path)
 
-def parser():
-    parser = argparse.ArgumentParser(description='All-seeing Eye: Search PDF metadata and contents')
-    parser.add_argument('query', help='Query for substring in metadata')
+    def items(self) -> Generator[Item, None, None]:
+        if self.start == 0:
+            yield from FileInfo(self.path, self.config)
+        with PdfDocument(self.path, self.config, start=self.start, stop=self.stop) as self.document:
+            yield from self.document
+
+
+def plugin_module(kind: str):
+    """
+    Return an argparse type expanding a plugin name like "rapidfuzz" to its
+    module all_seeing_eye.plugins.<kind>.rapidfuzz. Names of plugins installed
+    with an entry point in the group all_seeing_eye.<kind> are kept.
+    """
+    def expand(name: str) -> str:
+        if '.' in name or name in entry_points(f'all_seeing_eye.{kind}'):
+            return name
+        return f'all_seeing_eye.plugins.{kind}.{name}'
+    return expand
+
+
+def positive_int(value: str) -> int:
+    """
+    Return a command line value that must be an integer of at least 1
+    """
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'{value} is not a positive integer')
+    return number
+
+
+def add_common_arguments(parser):
     parser.add_argument('-d', '--directories', type=str,
                         nargs='+', help='Directories to search', default=[])
     parser.add_argument('-c', '--contents', help='Seach contents as well (slower)',
                         action='store_true')
-    parser.add_argument('--break', dest='brk', help='Stop after first match for each file',
-                        action='store_true')
-    parser.add_argument('--th', '--threshold', dest='threshold',
-                        help='Search score threshold', type=int, default=70)
-    parser.add_argument('-s', dest='segmentize', help='Segmentize words (very slow)',
+    parser.add_argument('-s', dest='segmentize', help='Segmentize words (slow, results are cached)',
                         action='store_true')
     parser.add_argument('-t', dest='tokenize',
-                        help='Tokenize the pages using sent_tokenize() (slower)', action='store_true')
+                        help='Tokenize the pages into sentences (slower)', action='store_true')
     parser.add_argument('-f', '--force', help='overwrite setting from config.json file',
                         action='store_true')
-    parser.add_argument('-r', '--reindex', help='rewrite the index', action='store_true')
+    parser.add_argument('-r', '--reindex', help='update the index and drop entries of deleted files',
+                        action='store_true')
+    parser.add_argument('-j', '--jobs', type=positive_int, default=1,
+                        help='Number of worker processes searching files in parallel')
+    parser.add_argument('--pdf-backend', type=plugin_module('pdf'), default=None,
+                        help='PDF plugin: pdfplumber (default), fitz (fast, falls back to pdfplumber on files or pages it cannot read) or PyPDF2')
+    parser.add_argument('--chunk-pages', type=positive_int, default=64,
+                        help='Pages per cache file and per job of large PDFs')
+    parser.add_argument('--cache-store', type=plugin_module('store'), default=None,
+                        help='Cache store plugin: directory (default, a file per chunk) or sqlite (one database file)')
+    parser.add_argument('--tokenizer', type=plugin_module('tokenizer'), default=None,
+                        help='Tokenizer plugin for -t: regex (default, fast) or tokenize (nltk\'s sent_tokenize)')
+    parser.add_argument('-m', '--matcher', type=plugin_module('matcher'), default=None,
+                        help='Matcher plugin: fuzzywuzzy (default), rapidfuzz (fast) or default_matcher')
     parser.add_argument('--config', type=str, help='path to the config file',
                         default='~/.config/ase/config.json')
     return parser
 
 
-def main():
+def add_profile_arguments(parser):
+    parser.add_argument('--profile', help='Print the latencies of the plugins, the cache hit ratios and the slowest files',
+                        action='store_true')
+    parser.add_argument('--profile-json', type=str, default=None, metavar='FILE',
+                        help='Write the profile as JSON to FILE, - for stdout')
+    return parser
+
+
+def parser():
+    parser = argparse.ArgumentParser(description='All-seeing Eye: Search PDF metadata and contents',
+                                     epilog='Run "ase index -h" for building the search index, '
+                                            '"ase batch -h" for searching many queries at once')
+    parser.add_argument('query', help='Query for substring in metadata')
+    parser.add_argument('--break', dest='brk', help='Stop after first match for each file',
+                        action='store_true')
+    parser.add_argument('--th', '--threshold', dest='threshold',
+                        help='Search score threshold', type=int, default=70)
+    parser.add_argument('-l', '--limit', type=positive_int, default=None,
+                        help='Only keep the best LIMIT matches, stop after LIMIT perfect matches')
+    parser.add_argument('--top', type=int, default=None, metavar='N',
+                        help='Rank the files by their matches, show the best N with snippets of their best pages')
+    parser.add_argument('-i', '--index', help='Search the index built by "ase index" instead of the files',
+                        action='store_true')
+    return add_profile_arguments(add_common_arguments(parser))
+
+
+def serve_parser():
+    parser = argparse.ArgumentParser(prog='ase serve',
+                                     description='All-seeing Eye: Answer queries of "ase query" with warm plugins and index')
+    parser.add_argument('--socket', type=str, default=None,
+                        help='path of the Unix socket, default ~/.cache/ase/ase.sock')
+    return add_common_arguments(parser)
+
+
+def query_parser():
+    search_parser = parser()
+    search_parser.prog = 'ase query'
+    search_parser.description = 'All-seeing Eye: Send a query to "ase serve", or search directly if it is not running'
+    search_parser.add_argument('--socket', type=str, default=None,
+                               help='path of the Unix socket, default ~/.cache/ase/ase.sock')
+    return search_parser
+
+
+def batch_parser():
+    parser = argparse.ArgumentParser(prog='ase batch',
+                                     description='All-seeing Eye: Search many queries in one pass over the files')
+    parser.add_argument('queries', help='File with one query per line, optionally followed by a tab and its threshold')
+    parser.add_argument('--break', dest='brk', help='Stop after first match for each file and query',
+                        action='store_true')
+    parser.add_argument('--th', '--threshold', dest='threshold',
+                        help='Search score threshold of queries without one', type=int, default=70)
+    parser.add_argument('-l', '--limit', type=positive_int, default=None,
+                        help='Only keep the best LIMIT matches of each query')
+    parser.add_argument('--json', help='Print the matches as JSON', action='store_true')
+    return add_profile_arguments(add_common_arguments(parser))
+
+
+def watch_parser():
+    parser = argparse.ArgumentParser(prog='ase watch',
+                                     description='All-seeing Eye: Keep the search index up to date while files change')
+    parser.add_argument('--debounce', type=float, default=1.0,
+                        help='Seconds without changes before a burst of changes is indexed')
+    parser.add_argument('--poll', help='Poll the directories instead of using inotify', action='store_true')
+    return add_common_arguments(parser)
+
+
+def index_parser():
+    parser = argparse.ArgumentParser(prog='ase index',
+                                     description='All-seeing Eye: Build the search index of PDF metadata and contents')
+    return add_profile_arguments(add_common_arguments(parser))
+
+
+# the settings of "ase query" that change its matches, "ase serve" searches
+# with them instead of its own
+QUERY_SETTINGS = ('directories', 'contents', 'segmentize', 'tokenize', 'matcher_module', 'tokenizer_module', 'pdf_module')
+
+
+def search(path: str, config: SearchConfig, query: str, threshold: int, brk: bool = False) -> List[Match]:
+    """
+    Return all matches of the query in one file. Items are scored in batches
+    of one location, i.e. per page of contents.
+
+    :param      path:       The path of the file
+    :type       path:       str
+    :param      config:     The search config
+    :type       config:     SearchConfig
+    :param      query:      The query
+    :type       query:      str
+    :param      threshold:  The minimal score of a match
+    :type       threshold:  int
+    :param      brk:        Stop after the first match
+    :type       brk:        bool
+
+    :returns:   The matches in the order they appear in the file
+    :rtype:     List[Match]
+    """
+    return search_segments(PdfSegments(path, config), config, query, threshold, brk)
+
+
+def search_segments(segments: PdfSegments, config: SearchConfig, query: str, threshold: int, brk: bool = False) -> List[Match]:
+    """
+    Return all matches of the query in the segments of a file, see search()
+    """
+    with closing(segments.__iter__()) as items:
+        return search_items(items, config, query, threshold, brk)
+
+
+def search_items(items: Iterable[Item], config: SearchConfig, query: str, threshold: int, brk: bool = False) -> List[Match]:
+    """
+    Return all matches of the query in the items of a file, scored in
+    batches of one location, see search()
+    """
+    matches: List[Match] = []
+    for where, group in groupby(items, key=attrgetter('where')):
+        matches.extend(score(list(group), config, query, threshold))
+        if brk and matches:
+            return matches[:1]
+    return matches
+
+
+def search_form(query: str) -> str:
+    """
+    Return the normalized query the matchers compare to the search form of
+    the items
+
+    :param      query:  The query
+    :type       query:  str
+
+    :returns:   The normalized query
+    :rtype:     str
+
+    :raises     ValueError:  If nothing is left to search for, e.g. of "!!!"
+    """
+    normalized = normalize(query)
+    if not normalized:
+        raise ValueError(f'Query {query!r} has no letters or digits to search for')
+    return normalized
+
+
+def score(items: List[Item], config: SearchConfig, query: str, threshold: int) -> List[Match]:
+    """
+    Score a batch of items in one matcher call
+
+    :param      items:      The items
+    :type       items:      List[Item]
+    :param      config:     The search config
+    :type       config:     SearchConfig
+    :param      query:      The query
+    :type       query:      str
+    :param      threshold:  The minimal score of a match
+    :type       threshold:  int
+
+    :returns:   The matches in the order of the items
+    :rtype:     List[Match]
+    """
+    with nullcontext() if config.stats is None or not items else config.stats.timed('score', items[0].path):
+        scores = config.matcher.score_batch([item.term.get('search', '') for item in items], search_form(query), threshold)
+    return [Match(int(score), item) for (score, item) in zip(scores, items) if score >= threshold]
+
+
+_worker: Dict[str, Any] = {}
+
+
+def init_worker(settings: Dict[str, Any], query: str, threshold: int, brk: bool):
+    """
+    Set up the plugins once per worker process, they are never pickled
+
+    :param      settings:   The settings of the parent's SearchConfig
+    :type       settings:   Dict[str, Any]
+    :param      query:      The query
+    :type       query:      str
+    :param      threshold:  The minimal score of a match
+    :type       threshold:  int
+    :param      brk:        Stop after the first match for each file
+    :type       brk:        bool
+    """
+    _worker.update(config=SearchConfig(**settings), query=query, threshold=threshold, brk=brk)
+
+
+def search_worker(unit: Tuple[str, int, Optional[int]]) -> Tuple[List[Match], List[Tuple[int, int]], Optional[Profile]]:
+    """
+    Search the pages start to stop of a file. Without a stop, the file
+    information, the metadata and the first chunk of pages are searched and
+    the page ranges of the other chunks are returned, such that the parent
+    can spread them over all workers. A profiled worker returns the profile
+    of this unit, to be merged by the parent.
+
+    :param      unit:  The path, start and stop
+    :type       unit:  Tuple[str, int, Optional[int]]
+
+    :returns:   The matches, the page ranges left to search and the profile
+    :rtype:     Tuple[List[Match], List[Tuple[int, int]], Optional[Profile]]
+    """
+    (path, start, stop) = unit
+    config = _worker['config']
+    size = config.chunk_pages
+    segments = PdfSegments(path, config, start=start, stop=size if stop is None else stop)
+    matches = search_segments(segments, config, _worker['query'], _worker['threshold'], _worker['brk'])
+    rest: List[Tuple[int, int]] = []
+    if stop is None and config.contents and segments.document is not None and not (_worker['brk'] and matches):
+        rest = [(first, first + size) for first in range(size, segments.document.pages, size)]
+    return (matches, rest, None if config.stats is None else config.stats.take())
+
+
+def search_parallel(pool: Any, files: List[str], brk: bool, stats: Optional[Profile] = None,
+                    window: int = 8) -> Iterator[List[Match]]:
+    """
+    Yield the matches of every file, searched by the workers of the pool.
+    Every file is searched by one worker up to its first chunk of pages, the
+    further chunks of large documents are submitted as soon as that unit
+    returns and spread over all workers. Only the next window files are
+    submitted, such that the results stream in order and the search stops
+    soon when the caller stops iterating.
+
+    :param      pool:    The pool, its workers set up by init_worker
+    :type       pool:    multiprocessing.Pool
+    :param      files:   The paths of the files
+    :type       files:   List[str]
+    :param      brk:     Stop after the first match for each file
+    :type       brk:     bool
+    :param      stats:   The profile to merge the profiles of the workers into
+    :type       stats:   Optional[Profile]
+    :param      window:  The number of files submitted ahead
+    :type       window:  int
 
-    app = App(parser().parse_args())
+    :returns:   The matches of every file in the order of the files
+    :rtype:     Iterator[List[Match]]
+    """
+    def get(result: Any) -> Tuple[List[Match], List[Tuple[int, int]]]:
+        (matches, rest, worker_stats) = result.get()
+        if stats is not None and worker_stats is not None:
+            stats.merge(worker_stats)
+        return (matches, rest)
+
+    def submit(path: str) -> Tuple[Any, List[Any]]:
+        chunks: List[Any] = []
+
+        def submit_rest(result: Tuple[List[Match], List[Tuple[int, int]], Optional[Profile]]):
+            # runs in the result thread of the pool, before get() returns
+            (matches, rest, _) = result
+            if not (brk and matches):
+                chunks.extend(pool.apply_async(search_worker, ((path, start, stop),)) for (start, stop) in rest)
+        return (pool.apply_async(search_worker, ((path, 0, None),), callback=submit_rest), chunks)
+
+    paths = iter(files)
+    pending = deque(submit(path) for path in islice(paths, max(1, window)))
+    while pending:
+        (first, chunks) = pending.popleft()
+        pending.extend(submit(path) for path in islice(paths, 1))
+        matches = get(first)[0]
+        for chunk in chunks:
+            if brk and matches:
+                break
+            matches += get(chunk)[0]
+        yield matches[:1] if brk else matches
+
+
+def init_batch_worker(settings: Dict[str, Any], queries: Sequence[Tuple[str, int]], brk: bool):
+    """
+    Set up the plugins of a worker process of a batch, see init_worker()
+    """
+    _worker.update(config=SearchConfig(**settings), queries=queries, brk=brk)
+
+
+def search_queries_worker(path: str) -> Tuple[List[List[Match]], Optional[Profile]]:
+    """
+    Return the matches of the queries of the batch in one file and the
+    profile of the worker, see search_queries()
+    """
+    config = _worker['config']
+    matches = search_queries(path, config, _worker['queries'], _worker['brk'])
+    return (matches, None if config.stats is None else config.stats.take())
+
+
+def search_queries_parallel(pool: Any, files: List[str], stats: Optional[Profile] = None,
+                            window: int = 8) -> Iterator[List[List[Match]]]:
+    """
+    Yield the matches of the queries of a batch in every file, searched by
+    the workers of the pool. Only the next window files are submitted, see
+    search_parallel().
+
+    :param      pool:    The pool, its workers set up by init_batch_worker
+    :type       pool:    multiprocessing.Pool
+    :param      files:   The paths of the files
+    :type       files:   List[str]
+    :param      stats:   The profile to merge the profiles of the workers into
+    :type       stats:   Optional[Profile]
+    :param      window:  The number of files submitted ahead
+    :type       window:  int
+
+    :returns:   The matches of every query in every file in the order of the
+                files
+    :rtype:     Iterator[List[List[Match]]]
+    """
+    paths = iter(files)
+    pending = deque(pool.apply_async(search_queries_worker, (path,)) for path in islice(paths, max(1, window)))
+    while pending:
+        result = pending.popleft()
+        pending.extend(pool.apply_async(search_queries_worker, (path,)) for path in islice(paths, 1))
+        (matches, worker_stats) = result.get()
+        if stats is not None and worker_stats is not None:
+            stats.merge(worker_stats)
+        yield matches
+
+
+def search_queries(path: str, config: SearchConfig, queries: Sequence[Tuple[str, int]], brk: bool = False) -> List[List[Match]]:
+    """
+    Return the matches of many queries in one file. The file is extracted
+    once, every batch of items is scored against all queries.
+
+    :param      path:     The path of the file
+    :type       path:     str
+    :param      config:   The search config
+    :type       config:   SearchConfig
+    :param      queries:  The queries and their thresholds
+    :type       queries:  Sequence[Tuple[str, int]]
+    :param      brk:      Stop after the first match of each query
+    :type       brk:      bool
+
+    :returns:   The matches of every query in the order they appear in the file
+    :rtype:     List[List[Match]]
+    """
+    matches: List[List[Match]] = [[] for _ in queries]
+    with closing(PdfSegments(path, config).__iter__()) as items:
+        for where, group in groupby(items, key=attrgetter('where')):
+            todo = [i for (i, found) in enumerate(matches) if not (brk and found)]
+            if not todo:
+                break
+            for (i, found) in zip(todo, score_queries(list(group), config, [queries[i] for i in todo])):
+                matches[i].extend(found[:1] if brk else found)
+    return matches
+
+
+def score_queries(items: List[Item], config: SearchConfig, queries: Sequence[Tuple[str, int]]) -> List[List[Match]]:
+    """
+    Score a batch of items against many queries in one matcher call, see
+    score()
+    """
+    with nullcontext() if config.stats is None or not items else config.stats.timed('score', items[0].path):
+        scores = config.matcher.score_queries([item.term.get('search', '') for item in items],
+                                              [(search_form(query), threshold) for (query, threshold) in queries])
+    return [[Match(int(score), item) for (score, item) in zip(query_scores, items) if score >= threshold]
+            for (query_scores, (query, threshold)) in zip(scores, queries)]
+
+
+def read_queries(path: str, threshold: int) -> List[Tuple[str, int]]:
+    """
+    Read the queries of a batch, one per line and optionally followed by a
+    tab and its threshold. Empty lines and lines starting with # are skipped.
+
+    :param      path:       The path of the file
+    :type       path:       str
+    :param      threshold:  The threshold of queries without one
+    :type       threshold:  int
+
+    :returns:   The queries and their thresholds
+    :rtype:     List[Tuple[str, int]]
+
+    :raises     ValueError:  If a threshold is not an integer or a query has
+                             no words, with the file and line number
+    """
+    queries = []
+    with open(path, 'r') as handle:
+        for (number, line) in enumerate(handle, 1):
+            line = line.rstrip('\n')
+            if not line.strip() or line.startswith('#'):
+                continue
+            (query, _, own) = line.partition('\t')
+            try:
+                search_form(query)
+                queries.append((query, int(own) if own.strip() else threshold))
+            except ValueError as e:
+                raise ValueError(f'{path}:{number}: {e}') from e
+    return queries
+
+
+def search_index(idx: 'Index', config: SearchConfig, query: str, threshold: int, results: Results):
+    """
+    Score the candidates of the index in batches until all are scored or the
+    results are done
+
+    :param      idx:        The index
+    :type       idx:        Index
+    :param      config:     The search config
+    :type       config:     SearchConfig
+    :param      query:      The query
+    :type       query:      str
+    :param      threshold:  The minimal score of a match
+    :type       threshold:  int
+    :param      results:    The results to add the matches to
+    :type       results:    Results
+    """
+    candidates = idx.candidates(query, threshold, config.matcher)
+    while not results.done and (batch := list(islice(candidates, 10000))):
+        results.add(score(batch, config, query, threshold))
+
+
+def update_index(idx: 'Index', config: SearchConfig, paths: Iterable[str]) -> int:
+    """
+    Extract and index the files that are new or changed since they were
+    indexed
+
+    :param      idx:     The index
+    :type       idx:     Index
+    :param      config:  The search config
+    :type       config:  SearchConfig
+    :param      paths:   The paths of the files
+    :type       paths:   Iterable[str]
+
+    :returns:   The number of items added
+    :rtype:     int
+    """
+    count = 0
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        key = f'{config.digests.digest(path)}-{config.extraction_hash}'
+        if idx.key(path) != key:
+            count += idx.update(path, key, PdfSegments(path, config))
+    return count
+
+
+def index_changes(idx: 'Index', config: SearchConfig, changed: Iterable[str], deleted: Iterable[str]) -> Tuple[int, int]:
+    """
+    Update the index with a batch of changes of the watcher. A file that
+    cannot be indexed, e.g. one that is still being written, is reported
+    and skipped, it is tried again on its next change. The index is
+    compacted once many items were removed, see Index.compact_stale().
+
+    :param      idx:      The index
+    :type       idx:      Index
+    :param      config:   The search config
+    :type       config:   SearchConfig
+    :param      changed:  The paths of new or changed files
+    :type       changed:  Iterable[str]
+    :param      deleted:  The paths of deleted files
+    :type       deleted:  Iterable[str]
+
+    :returns:   The number of items added and of files that failed
+    :rtype:     Tuple[int, int]
+    """
+    (count, failed) = (0, 0)
+    for (path, update) in [(path, False) for path in deleted] + [(path, True) for path in sorted(changed)]:
+        try:
+            if update:
+                count += update_index(idx, config, [path])
+            else:
+                idx.remove(path)
+        except Exception as e:
+            failed += 1
+            print(f"Could not index {path}: {e.__class__.__name__}: {e}", file=sys.stderr)
+    idx.compact_stale()
+    return (count, failed)
+
+
+def index(argv: List[str]):
+    from all_seeing_eye.lib.index import Index
+    app = App(index_parser().parse_args(argv))
+
+    with app.config.ui as ui, Index(app.config.index_file) as idx:
+        count = update_index(idx, app.config, ui.progress(app.config.files))
+        removed = idx.prune(app.config.files)
+        if app.config.reindex:
+            PdfDocument.collect_garbage(app.config)
+            idx.compact()
+
+    print(f"Indexed {count} new items, removed {removed} deleted files, {len(app.config.files)} files in {app.config.index_file}")
+    app.show_profile()
+
+
+def watch(argv: List[str]):
+    from all_seeing_eye.lib.index import Index
+    from all_seeing_eye.lib.watcher import Watcher
+    app = App(watch_parser().parse_args(argv))
+
+    with Index(app.config.index_file) as idx:
+        watcher = Watcher(app.config.directories, debounce=app.args.debounce, polling=app.args.poll)
+        count = update_index(idx, app.config, app.config.files)
+        removed = idx.prune(app.config.files)
+        print(f"Indexed {count} new items, removed {removed} deleted files, "
+              f"watching {app.config.directories} {'by polling' if watcher.inotify is None else 'with inotify'}")
+        try:
+            for (changed, deleted) in watcher.batches():
+                (count, failed) = index_changes(idx, app.config, changed, deleted)
+                print(f"Indexed {count} new items of {len(changed)} changed files, removed {len(deleted)} deleted files"
+                      + (f", {failed} files failed" if failed else ''))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
+
+
+def settings_key(settings: Dict[str, Any]) -> str:
+    """
+    Return the key of the settings of a config that change the matches
+    """
+    return json.dumps([settings[name] for name in QUERY_SETTINGS])
+
+
+@dataclass
+class WarmFiles:
+    """
+    The files of a config and their items, kept in memory by "ase serve". A
+    file is extracted, or loaded from the cache, on the first query that
+    searches it. A watcher thread adds new files, removes deleted ones and
+    drops the items of changed ones, such that queries never look up or
+    read files again.
+    """
+    config: SearchConfig
+    items: Dict[str, List[Item]] = field(default_factory=dict, repr=False)
+    versions: Dict[str, int] = field(default_factory=dict, repr=False)
+    lock: Any = field(default_factory=threading.Lock, repr=False)
+
+    def __post_init__(self):
+        from all_seeing_eye.lib.watcher import Watcher
+        self.watcher = Watcher(self.config.directories)
+        self.config.files = sorted(self.watcher.known)
+        threading.Thread(target=self.watch, daemon=True).start()
+
+    def watch(self):
+        for (changed, deleted) in self.watcher.batches():
+            with self.lock:
+                for path in changed | deleted:
+                    self.items.pop(path, None)
+                    self.versions[path] = self.versions.get(path, 0) + 1
+                self.config.files = sorted((set(self.config.files) - deleted) | changed)
+
+    def file_items(self, path: str) -> List[Item]:
+        """
+        Return the items of a file, extracted on the first call
+        """
+        with self.lock:
+            (items, version) = (self.items.get(path), self.versions.get(path, 0))
+        if items is None:
+            items = list(PdfSegments(path, self.config))
+            with self.lock:
+                # not kept if the file changed while it was extracted
+                if self.versions.get(path, 0) == version:
+                    self.items[path] = items
+        return items
+
+    def search(self, query: str, threshold: int, brk: bool, results: Results):
+        """
+        Add the matches of the query in the files to results until all files
+        are searched or the results are done
+        """
+        with self.lock:
+            files = list(self.config.files)
+        for path in files:
+            results.add(search_items(self.file_items(path), self.config, query, threshold, brk))
+            if results.done:
+                break
+
+
+def answer_query(app: App, idx: Optional['Index'], warm: Dict[str, WarmFiles], request: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Answer a request of "ase query" in the daemon. The settings of the query
+    are applied to the config of the daemon, the files and items of every
+    distinct settings are kept in memory, see WarmFiles. The index is only
+    searched with -i and the settings it was built with.
+
+    :param      app:      The app of the daemon
+    :type       app:      App
+    :param      idx:      The open index, None if there is none
+    :type       idx:      Optional[Index]
+    :param      warm:     The files by their settings
+    :type       warm:     Dict[str, WarmFiles]
+    :param      request:  The query, threshold, limit, brk, index and settings
+    :type       request:  Dict[str, Any]
+
+    :returns:   The matches, or the reason the daemon cannot answer the query
+    :rtype:     Dict[str, Any]
+    """
+    settings = {**app.config.settings(), **request.get('settings', {})}
+    key = settings_key(settings)
+    if key not in warm:
+        config = app.config if key == settings_key(app.config.settings()) else SearchConfig(**{**settings, 'files': []})
+        warm[key] = WarmFiles(config)
+    files = warm[key]
+
+    results = Results(request.get('limit'))
+    if request.get('index'):
+        if idx is None:
+            return {'refused': 'the daemon has no index'}
+        if files.config.extraction_hash != app.config.extraction_hash:
+            return {'refused': 'the index of the daemon was built with other settings'}
+        search_index(idx, files.config, request['query'], request['threshold'], results)
+    else:
+        files.search(request['query'], request['threshold'], request.get('brk', False), results)
+    return {'matches': [asdict(match) for match in results.finish()]}
+
+
+def serve(argv: List[str]):
+    from all_seeing_eye.lib import server
+    from all_seeing_eye.lib.index import Index
+    app = App(serve_parser().parse_args(argv))
+    idx = Index(app.config.index_file) if os.path.exists(app.config.index_file) else None
+    warm = {settings_key(app.config.settings()): WarmFiles(app.config)}
+
+    print(f"Serving {len(app.config.files)} files{' and the index' if idx else ''} on {app.args.socket or server.DEFAULT_SOCKET}")
+    try:
+        server.serve(app.args.socket, partial(answer_query, app, idx, warm))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if idx is not None:
+            idx.close()
+
+
+def query(argv: List[str]):
+    from all_seeing_eye.lib import server
+    args = query_parser().parse_args(argv)
+    if args.reindex or args.profile or args.profile_json:
+        # the daemon neither collects the cache garbage nor profiles a query
+        return run(args)
+    try:
+        search_form(args.query)
+    except ValueError as e:
+        query_parser().error(str(e))
+    # the files are looked up by the daemon
+    app = App(args, remote=True)
+    settings = {name: app.config.settings()[name] for name in QUERY_SETTINGS if name != 'directories'}
+    directories = args.directories or app.load_settings().get('directories')
+    if directories:
+        # else the directories the daemon was started with
+        settings['directories'] = directories
+    try:
+        response = server.request(args.socket, {'query': args.query, 'threshold': args.threshold, 'limit': args.limit,
+                                                'brk': args.brk, 'index': args.index, 'settings': settings})
+    except OSError:
+        return run(args)
+    if 'refused' in response:
+        print(f"ase serve cannot answer the query, {response['refused']}, searching directly", file=sys.stderr)
+        return run(args)
+
+    with app.config.ui as ui:
+        app.add_matches(Match(m['score'], Item(**m['item'])) for m in response['matches'])
+        app.finish()
+        ui.show_results()
+
+
+def batch(argv: List[str]):
+    args = batch_parser().parse_args(argv)
+    try:
+        queries = read_queries(args.queries, args.threshold)
+    except ValueError as e:
+        batch_parser().error(str(e))
+    app = App(args)
+    results = [Results(app.args.limit) for _ in queries]
+
+    pool: Optional[Any] = None
+    found: Iterator[List[List[Match]]]
+    if app.config.jobs > 1:
+        from multiprocessing import Pool
+        pool = Pool(app.config.jobs, initializer=init_batch_worker, initargs=(app.config.settings(), queries, app.args.brk))
+        found = search_queries_parallel(pool, app.config.files, app.config.stats, window=2 * app.config.jobs)
+    else:
+        found = (search_queries(path, app.config, queries, app.args.brk) for path in app.config.files)
+
+    with app.config.ui as ui:
+        for (path, file_matches) in zip(ui.progress(app.config.files), found):
+            for (query_results, matches) in zip(results, file_matches):
+                query_results.add(matches)
+            if all(query_results.done for query_results in results):
+                break
+        for query_results in results:
+            query_results.finish()
+
+        if app.args.json:
+            print(json.dumps([{'query': query, 'threshold': threshold, 'matches': [asdict(m) for m in query_results.matches]}
+                              for ((query, threshold), query_results) in zip(queries, results)], indent=4))
+        else:
+            for ((query, threshold), query_results) in zip(queries, results):
+                print(f"{query!r} (threshold {threshold}):")
+                app.results = query_results
+                ui.show_results()
+
+    if pool is not None:
+        if all(query_results.done for query_results in results):
+            pool.terminate()
+        else:
+            pool.close()
+        pool.join()
+    app.show_profile()
+
+
+commands = {
+    'index': index,
+    'batch': batch,
+    'watch': watch,
+    'serve': serve,
+    'query': query,
+}
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in commands:
+        return commands[argv[0]](argv[1:])
+
+    run(parser().parse_args(argv))
+
+
+def run(args: argparse.Namespace):
+    try:
+        search_form(args.query)
+    except ValueError as e:
+        parser().error(str(e))
+    app = App(args)
     print(f"{app.config = }")
 
+    if app.config.reindex:
+        PdfDocument.collect_garbage(app.config)
+
+    if app.args.index:
+        from all_seeing_eye.lib.index import Index
+        with app.config.ui as ui, Index(app.config.index_file) as idx:
+            search_index(idx, app.config, app.args.query, app.args.threshold, app.results)
+            app.finish()
+            ui.show_results()
+        app.show_profile()
+        return
+
+    pool: Optional[Any] = None
+    stages: Optional[Generator[Tuple[str, List[Match]], None, None]] = None
+    results: Iterator[List[Match]]
+    if app.config.jobs > 1:
+        from multiprocessing import Pool
+        pool = Pool(app.config.jobs, initializer=init_worker,
+                    initargs=(app.config.settings(), app.args.query, app.args.threshold, app.args.brk))
+        results = search_parallel(pool, app.config.files, app.args.brk, app.config.stats, window=2 * app.config.jobs)
+    else:
+        from all_seeing_eye.lib.pipeline import Pipeline
+        pipeline = Pipeline(app.config, app.args.query, app.args.threshold, app.args.brk)
+        stages = pipeline.search(app.config.files)
+        results = (matches for (path, matches) in stages)
+
     with app.config.ui as ui:
-        for path in ui.progress(app.config.files):
-            for item in PdfSegments(path, app.config):
-                if (score := app.config.matcher.score(item.term.get('search'), app.args.query)) >= app.args.threshold:
-                    app.matches.append(Match(score, item))
+        for path, matches in zip(ui.progress(app.config.files), results):
+            app.add_matches(matches)
+            if app.done:
+                break
 
+        app.finish()
         ui.show_results()
 
+    if stages is not None:
+        # stops the stages that may still be reading ahead
+        stages.close()
+    if pool is not None:
+        if app.done:
+            pool.terminate()
+        else:
+            pool.close()
+        pool.join()
+    app.show_profile()
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,330 @@
+import os
+import sys
+import json
+import heapq
+import hashlib
+from itertools import count
+from functools import cached_property
+from argparse import Namespace
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple, Callable, TypeVar, cast, TYPE_CHECKING
+from all_seeing_eye.plugins.pdf.pdf import Pdf
+from all_seeing_eye.plugins.matcher.matcher import Matcher
+from all_seeing_eye.plugins.segmentizer.segmentizer import Segmentizer
+from all_seeing_eye.plugins.tokenizer.tokenizer import Tokenizer
+from all_seeing_eye.plugins.ui.ui import Ui
+from all_seeing_eye.plugins.store.store import Store
+from all_seeing_eye.lib.digests import FileDigests
+from all_seeing_eye.lib.profile import Profile
+from all_seeing_eye.lib import normalize
+
+# sqlite3 is imported on first use of the segment cache
+if TYPE_CHECKING:
+    from all_seeing_eye.lib.segments import SegmentCache
+    from all_seeing_eye.lib.ranking import Ranking
+
+PluginType = TypeVar('PluginType')
+
+
+@dataclass
+class Item:
+    """
+    A searchable term in a file: a sentence, an annotation, a metadata value
+    """
+    path: str
+    where: str
+    term: Dict[str, str]
+
+
+@dataclass
+class Match:
+    score: int
+    item: Item
+
+
+@dataclass
+class SearchConfig:
+    """
+    Settings of a search run together with the plugin instances used by it
+    """
+    directories: List[str] = field(default_factory=list)
+    contents: bool = False
+    segmentize: bool = False
+    tokenize: bool = False
+    reindex: bool = False
+    cache_dir: Optional[str] = '~/.cache/ase'
+    jobs: int = 1
+    chunk_pages: int = 64
+    matcher_module: Optional[str] = None
+    tokenizer_module: Optional[str] = None
+    pdf_module: Optional[str] = None
+    store_module: Optional[str] = None
+    profile: bool = False
+    files: List[str] = field(default_factory=list, repr=False)
+    ui: Ui = field(init=False, repr=False)
+    digests: FileDigests = field(init=False, repr=False)
+    stats: Optional[Profile] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        if self.cache_dir is not None:
+            self.cache_dir = os.path.expanduser(self.cache_dir)
+        self.digests = FileDigests(self.cache_dir)
+        if self.profile:
+            self.stats = Profile()
+        if not self.files:
+            self.files = self.find_files()
+
+    # The plugins are set up on first use only, such that their modules are
+    # not imported (and wordsegment's corpus not loaded) if a run never needs
+    # them, e.g. the segmentizer without -s or the matcher while indexing.
+    @cached_property
+    def pdf(self) -> Pdf:
+        # not shared, the plugin holds the open document of this config
+        return self.instrumented(cast(Pdf, Pdf.create(self.pdf_module)), 'Pdf', ['get_page_text'])
+
+    @cached_property
+    def fallback_pdf(self) -> Optional[Pdf]:
+        """
+        The default PDF plugin for the files the selected one cannot read, None
+        if the default is selected
+        """
+        if isinstance(self.pdf, Pdf.get_class()):
+            return None
+        return self.instrumented(cast(Pdf, Pdf.create()), 'Pdf', ['get_page_text'])
+
+    @cached_property
+    def tokenizer(self) -> Tokenizer:
+        tokenizer = Tokenizer.get_instance(self.tokenizer_module if self.tokenize else 'all_seeing_eye.plugins.tokenizer.default_tokenizer')
+        return self.instrumented(cast(Tokenizer, tokenizer), 'Tokenizer', ['tokenize', 'tokenize_many'])
+
+    @cached_property
+    def segmentizer(self) -> Segmentizer:
+        return self.instrumented(cast(Segmentizer, Segmentizer.get_instance()), 'Segmentizer', ['segment'])
+
+    @cached_property
+    def segments(self) -> 'SegmentCache':
+        """
+        The memoized segmentizer
+        """
+        from all_seeing_eye.lib.segments import SegmentCache
+        return SegmentCache(self.segmentizer, self.cache_dir, profile=self.stats)
+
+    @cached_property
+    def store(self) -> Optional[Store]:
+        """
+        The store of the cached chunks, None without a cache_dir
+        """
+        if self.cache_dir is None:
+            return None
+        store = cast(Store, Store.create(self.store_module))
+        store.open(self.cache_dir, 'PdfDocument')
+        return store
+
+    @cached_property
+    def matcher(self) -> Matcher:
+        return self.instrumented(cast(Matcher, Matcher.get_instance(self.matcher_module)), 'Matcher', ['score', 'score_batch', 'score_queries'])
+
+    def instrumented(self, plugin: PluginType, kind: str, methods: List[str]) -> PluginType:
+        """
+        Return the plugin, with its methods timed if the run is profiled
+        """
+        return plugin if self.stats is None else self.stats.instrument(plugin, kind, methods)
+
+    @property
+    def index_file(self) -> str:
+        if self.cache_dir is None:
+            raise Exception('The search index needs a cache_dir')
+        return os.path.join(self.cache_dir, 'index.sqlite')
+
+    @property
+    def extraction_hash(self) -> str:
+        """
+        The md5 of the settings that change what is extracted from a file
+        """
+        hash_args: List[Any] = [
+            self.segmentize,
+            self.tokenize,
+            self.contents,
+            f'normalize-{normalize.VERSION}',
+        ]
+        if self.pdf_module not in (None, Pdf._module_name):
+            hash_args.append(self.pdf_module)
+        if self.tokenize:
+            hash_args.append(self.tokenizer_module or Tokenizer._module_name)
+        return hashlib.md5(str(hash_args).encode()).hexdigest()
+
+    def find_files(self) -> List[str]:
+        """
+        Return all PDF files below the configured directories
+
+        :returns:   The sorted list of paths
+        :rtype:     List[str]
+        """
+        return sorted(os.path.join(root, name)
+                      for directory in self.directories
+                      for (root, dirs, names) in os.walk(os.path.expanduser(directory))
+                      for name in names if name.lower().endswith('.pdf'))
+
+    def settings(self) -> Dict[str, Any]:
+        """
+        Return the plain settings of this config, without plugin instances,
+        such that an equivalent config can be built in another process
+
+        :returns:   The keyword arguments for SearchConfig
+        :rtype:     Dict[str, Any]
+        """
+        return {
+            'directories': self.directories,
+            'contents': self.contents,
+            'segmentize': self.segmentize,
+            'tokenize': self.tokenize,
+            'reindex': self.reindex,
+            'cache_dir': self.cache_dir,
+            'jobs': self.jobs,
+            'chunk_pages': self.chunk_pages,
+            'matcher_module': self.matcher_module,
+            'tokenizer_module': self.tokenizer_module,
+            'pdf_module': self.pdf_module,
+            'store_module': self.store_module,
+            'profile': self.profile,
+            'files': self.files,
+        }
+
+
+@dataclass
+class Results:
+    """
+    Collects the matches of one query. With a limit, only the best matches
+    are kept in a bounded heap, ties are won by earlier matches.
+    """
+    limit: Optional[int] = None
+    on_match: Callable[[Match], Any] = field(default=lambda match: None, repr=False)
+    matches: List[Match] = field(default_factory=list)
+    best: List[Tuple[int, int, Match]] = field(default_factory=list, repr=False)
+    counter: Iterator[int] = field(default_factory=count, repr=False)
+
+    @property
+    def done(self) -> bool:
+        """
+        Whether the best LIMIT matches are all perfect and the search can stop
+        """
+        return self.limit is not None and len(self.best) == self.limit and self.best[0][0] >= 100
+
+    def add(self, matches: Iterable[Match]):
+        """
+        Collect new matches, on_match is called for every match that is kept
+
+        :param      matches:  The matches
+        :type       matches:  Iterable[Match]
+        """
+        for match in matches:
+            if self.limit is None:
+                self.matches.append(match)
+            elif len(self.best) < self.limit:
+                heapq.heappush(self.best, (match.score, -next(self.counter), match))
+            elif match.score > self.best[0][0]:
+                heapq.heapreplace(self.best, (match.score, -next(self.counter), match))
+            else:
+                continue
+            self.on_match(match)
+
+    def finish(self) -> List[Match]:
+        """
+        Move the best matches to matches, ordered by descending score
+
+        :returns:   The matches
+        :rtype:     List[Match]
+        """
+        if self.limit is not None:
+            self.matches = [match for (_, _, match) in sorted(self.best, key=lambda x: x[:2], reverse=True)]
+        return self.matches
+
+
+@dataclass
+class App:
+    args: Namespace
+    # the files are searched by "ase serve", the directories are not walked
+    remote: bool = False
+    config: SearchConfig = field(init=False)
+    results: Results = field(init=False)
+
+    def __post_init__(self):
+        directories = self.args.directories or self.load_settings().get('directories', [])
+        self.config = SearchConfig(
+            directories=[] if self.remote else directories,
+            contents=self.args.contents,
+            segmentize=self.args.segmentize,
+            tokenize=self.args.tokenize,
+            reindex=self.args.reindex,
+            jobs=self.args.jobs,
+            chunk_pages=self.args.chunk_pages,
+            matcher_module=self.args.matcher,
+            tokenizer_module=self.args.tokenizer,
+            pdf_module=self.args.pdf_backend,
+            store_module=self.args.cache_store,
+            profile=bool(getattr(self.args, 'profile', False) or getattr(self.args, 'profile_json', None)),
+        )
+        if self.args.force:
+            self.store_settings({'directories': directories})
+
+        self.config.ui = Ui.create()
+        self.config.ui.app = self
+        self.results = Results(getattr(self.args, 'limit', None))
+        if getattr(self.args, 'top', None) is None:
+            # with --top, only the ranking is shown
+            self.results.on_match = self.config.ui.new_match
+
+    @property
+    def matches(self) -> List[Match]:
+        return self.results.matches
+
+    @property
+    def done(self) -> bool:
+        return self.results.done
+
+    def add_matches(self, matches: Iterable[Match]):
+        self.results.add(matches)
+
+    def finish(self):
+        self.results.finish()
+
+    def ranking(self) -> Optional['Ranking']:
+        """
+        Return the matches ranked by file and page with --top, None otherwise
+        """
+        if getattr(self.args, 'top', None) is None:
+            return None
+        from all_seeing_eye.lib.ranking import Ranking
+        return Ranking(self.args.query).add(self.matches)
+
+    def show_profile(self):
+        """
+        Print the profile of a profiled run as a table on stderr and/or
+        write it as JSON
+        """
+        stats = self.config.stats
+        if stats is None:
+            return
+        if getattr(self.args, 'profile', False):
+            stats.write_table(sys.stderr)
+        path = getattr(self.args, 'profile_json', None)
+        if path == '-':
+            stats.write_json(sys.stdout)
+        elif path is not None:
+            with open(path, 'w') as handle:
+                stats.write_json(handle)
+
+    @property
+    def config_file(self) -> str:
+        return os.path.expanduser(str(self.args.config))
+
+    def load_settings(self) -> Dict[str, Any]:
+        if os.path.exists(self.config_file):
+            with open(self.config_file, 'r') as handle:
+                return dict(json.load(handle))
+        return {}
+
+    def store_settings(self, settings: Dict[str, Any]):
+        os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
+        with open(self.config_file, 'w') as handle:
+            json.dump({**self.load_settings(), **settings}, handle, indent=4)
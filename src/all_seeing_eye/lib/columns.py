@@ -0,0 +1,240 @@
+import os
+import sys
+import mmap
+import shutil
+import struct
+import tempfile
+from array import array
+from dataclasses import dataclass, field
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+from all_seeing_eye.lib.app import Item
+
+MAGIC = b'ASEC'
+VERSION = 3
+BYTEORDER = {'little': 1, 'big': 2}[sys.byteorder]
+
+# uint32 location id per item, uint32 offsets into the text buffers and an
+# int32 reference into the search column or -1 if the search text is the
+# display text. Both texts are read as stored, nothing is normalized on load.
+SECTIONS = ('location_offsets', 'locations', 'item_location',
+            'display_offsets', 'display', 'search_ref',
+            'search_offsets', 'search')
+HEADER = struct.Struct(f'<4sBBxxI{2 * len(SECTIONS)}Q')
+
+
+def align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def texts(strings: Sequence[str]):
+    """
+    Return the offsets array and the concatenated UTF-8 buffer of strings
+    """
+    encoded = [s.encode('utf-8', 'surrogatepass') for s in strings]
+    offsets = array('I', [0])
+    for e in encoded:
+        offsets.append(offsets[-1] + len(e))
+    return offsets, b''.join(encoded)
+
+
+@dataclass
+class Columns:
+    """
+    Memory-mapped reader of a columnar file. Items are decoded one at a time
+    while iterating, the file is never loaded as a whole. Given data, e.g. a
+    blob of a cache store, it is read instead of the file fname.
+    """
+    fname: str
+    path: str
+    data: Optional[bytes] = field(default=None, repr=False)
+    mm: Optional[mmap.mmap] = field(default=None, init=False, repr=False)
+    count: int = field(default=0, init=False)
+
+    def __post_init__(self):
+        """
+        :raises     ValueError:  If the file is not a columnar file of this
+                                 version and byte order
+        """
+        buffer: Union[bytes, mmap.mmap]
+        if self.data is None:
+            with open(self.fname, 'rb') as handle:
+                buffer = self.mm = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buffer = self.data
+        if len(buffer) < HEADER.size:
+            self.close()
+            raise ValueError(f'{self.fname} is not a columnar cache file')
+        (magic, version, byteorder, self.count, *spans) = HEADER.unpack_from(buffer)
+        if (magic, version, byteorder) != (MAGIC, VERSION, BYTEORDER):
+            self.close()
+            raise ValueError(f'{self.fname} is not a columnar cache file of version {VERSION}')
+
+        view = memoryview(buffer)
+        self.sections = {name: view[offset:offset+length]
+                         for (name, offset, length) in zip(SECTIONS, spans[::2], spans[1::2])}
+        for name in ('location_offsets', 'item_location', 'display_offsets', 'search_offsets'):
+            self.sections[name] = self.sections[name].cast('I')
+        self.sections['search_ref'] = self.sections['search_ref'].cast('i')
+        self.locations = self.strings('location_offsets', 'locations')
+
+    @staticmethod
+    def dump(items: Iterable[Item], fname: str):
+        """
+        Write items into a compact columnar file. The path of the items is not
+        stored, every location is stored once and texts are concatenated into
+        one buffer each, search texts only where they differ from the
+        display text.
+
+        :param      items:  The items of one file
+        :type       items:  Iterable[Item]
+        :param      fname:  The file name to write
+        :type       fname:  str
+        """
+        with ColumnsWriter(fname) as writer:
+            for item in items:
+                writer.append(item)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        for view in getattr(self, 'sections', {}).values():
+            view.release()
+        self.sections = {}
+        self.locations = []
+        if self.mm is not None:
+            try:
+                self.mm.close()
+            except BufferError:
+                # a view is still exported, the map is closed on collection
+                pass
+            self.mm = None
+
+    def text(self, offsets: str, buffer: str, i: int) -> str:
+        (start, end) = self.sections[offsets][i:i+2]
+        return str(self.sections[buffer][start:end], 'utf-8', 'surrogatepass')
+
+    def strings(self, offsets: str, buffer: str) -> List[str]:
+        return [self.text(offsets, buffer, i) for i in range(len(self.sections[offsets]) - 1)]
+
+    def __getitem__(self, i: int) -> Item:
+        display = self.text('display_offsets', 'display', i)
+        ref = self.sections['search_ref'][i]
+        search = display if ref < 0 else self.text('search_offsets', 'search', ref)
+        return Item(self.path, self.locations[self.sections['item_location'][i]], {'display': display, 'search': search})
+
+    def __iter__(self) -> Iterator[Item]:
+        locations, item_location = self.locations, self.sections['item_location']
+        offsets, display = self.sections['display_offsets'], self.sections['display']
+        search_ref = self.sections['search_ref']
+        for i in range(self.count):
+            text = str(display[offsets[i]:offsets[i+1]], 'utf-8', 'surrogatepass')
+            search = text if search_ref[i] < 0 else self.text('search_offsets', 'search', search_ref[i])
+            yield Item(self.path, locations[item_location[i]], {'display': text, 'search': search})
+
+
+@dataclass
+class ColumnsWriter:
+    """
+    Writes a columnar file while the items are appended, such that memory
+    does not depend on the number of items. The sections are collected in
+    blocks of block items, every block is appended to a spool file per
+    section, which moves to disk once it exceeds spool bytes. The sections
+    are copied into fname when the writer is closed.
+
+        with ColumnsWriter(fname) as writer:
+            for item in items:
+                writer.append(item)
+
+    Leaving the with block by an exception discards the file.
+    """
+    fname: str
+    block: int = 4096
+    spool: int = 1 << 20
+    count: int = field(default=0, init=False)
+
+    def __post_init__(self):
+        self.location_ids: Dict[str, int] = {}
+        self.spools: Dict[str, IO[bytes]] = {
+            name: tempfile.SpooledTemporaryFile(self.spool, dir=os.path.dirname(self.fname) or None) for name in SECTIONS
+        }
+        self.arrays = {'item_location': array('I'), 'display_offsets': array('I', [0]),
+                       'search_ref': array('i'), 'search_offsets': array('I', [0])}
+        self.buffers: Dict[str, List[bytes]] = {'display': [], 'search': []}
+        self.ends = {'display': 0, 'search': 0}
+        self.searches = 0
+
+    def __enter__(self) -> 'ColumnsWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def text(self, offsets: str, buffer: str, text: str):
+        encoded = text.encode('utf-8', 'surrogatepass')
+        self.buffers[buffer].append(encoded)
+        self.ends[buffer] += len(encoded)
+        self.arrays[offsets].append(self.ends[buffer])
+
+    def append(self, item: Item):
+        """
+        Append an item to the file, see Columns.dump()
+
+        :param      item:  The item
+        :type       item:  Item
+        """
+        self.arrays['item_location'].append(self.location_ids.setdefault(item.where, len(self.location_ids)))
+        search = item.term.get('search', '')
+        display = item.term.get('display', search)
+        self.text('display_offsets', 'display', display)
+        if search == display:
+            self.arrays['search_ref'].append(-1)
+        else:
+            self.arrays['search_ref'].append(self.searches)
+            self.text('search_offsets', 'search', search)
+            self.searches += 1
+        self.count += 1
+        if self.count % self.block == 0:
+            self.flush()
+
+    def flush(self):
+        for (name, values) in self.arrays.items():
+            self.spools[name].write(values.tobytes())
+            del values[:]
+        for (name, buffer) in self.buffers.items():
+            self.spools[name].write(b''.join(buffer))
+            buffer.clear()
+
+    def close(self):
+        """
+        Write the file from the spooled sections
+        """
+        self.flush()
+        location_offsets, locations = texts(list(self.location_ids))
+        self.spools['location_offsets'].write(location_offsets.tobytes())
+        self.spools['locations'].write(locations)
+
+        spans: List[int] = []
+        position = align(HEADER.size)
+        for name in SECTIONS:
+            length = self.spools[name].tell()
+            spans += [position, length]
+            position = align(position + length)
+
+        with open(self.fname, 'wb') as handle:
+            handle.write(HEADER.pack(MAGIC, VERSION, BYTEORDER, self.count, *spans))
+            for (name, offset) in zip(SECTIONS, spans[::2]):
+                handle.seek(offset)
+                self.spools[name].seek(0)
+                shutil.copyfileobj(self.spools[name], handle)
+        self.discard()
+
+    def discard(self):
+        for spool in self.spools.values():
+            spool.close()
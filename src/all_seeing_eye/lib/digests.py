@@ -0,0 +1,103 @@
+import os
+import pickle
+import threading
+import hashlib
+from dataclasses import dataclass
+from typing import Optional, Set, Tuple
+from all_seeing_eye.plugins.store.store import Store
+
+
+@dataclass
+class FileDigests:
+    """
+    Content digests of files. The digest of a file is remembered together
+    with its mtime, size and inode, such that an unchanged file is never
+    hashed twice.
+    """
+    cache_dir: Optional[str] = None
+    chunk_size: int = 1 << 20
+
+    @property
+    def digest_dir(self) -> str:
+        return f'{self.cache_dir}/{self.__class__.__name__}'
+
+    def entry_fname(self, path: str) -> str:
+        return f'{self.digest_dir}/{hashlib.md5(os.path.abspath(path).encode()).hexdigest()}.cache'
+
+    @staticmethod
+    def stat(path: str) -> Tuple[int, int, int]:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def compute(self, path: str) -> str:
+        md5 = hashlib.md5()
+        with open(path, 'rb') as handle:
+            while chunk := handle.read(self.chunk_size):
+                md5.update(chunk)
+        return md5.hexdigest()
+
+    def digest(self, path: str) -> str:
+        """
+        Return the md5 digest of the contents of a file
+
+        :param      path:  The path of the file
+        :type       path:  str
+
+        :returns:   The hex digest
+        :rtype:     str
+        """
+        if self.cache_dir is None:
+            return self.compute(path)
+
+        stat = self.stat(path)
+        fname = self.entry_fname(path)
+        try:
+            with open(fname, 'rb') as handle:
+                (_, old_stat, digest) = pickle.load(handle)
+            if old_stat == stat:
+                return str(digest)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+            pass
+
+        digest = self.compute(path)
+        os.makedirs(self.digest_dir, exist_ok=True)
+        # renamed into place, such that concurrent runs never read a partial entry
+        tmp = f'{fname}.{os.getpid()}-{threading.get_ident()}.tmp'
+        with open(tmp, 'wb') as handle:
+            pickle.dump((os.path.abspath(path), stat, digest), handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, fname)
+        return digest
+
+    def collect_garbage(self) -> Set[str]:
+        """
+        Forget the digests of deleted files, drop unreadable entries and the
+        temporary files left behind by killed runs
+
+        :returns:   The digests of the files that still exist
+        :rtype:     Set[str]
+        """
+        live: Set[str] = set()
+        if self.cache_dir is None or not os.path.isdir(self.digest_dir):
+            return live
+
+        Store.remove_stale(self.digest_dir)
+        for name in os.listdir(self.digest_dir):
+            if not name.endswith('.cache'):
+                continue
+            fname = f'{self.digest_dir}/{name}'
+            try:
+                with open(fname, 'rb') as handle:
+                    (path, _, digest) = pickle.load(handle)
+                if os.path.exists(path):
+                    live.add(digest)
+                    continue
+            except FileNotFoundError:
+                # removed by a concurrent run
+                continue
+            except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError):
+                pass
+            try:
+                os.remove(fname)
+            except FileNotFoundError:
+                pass
+        return live
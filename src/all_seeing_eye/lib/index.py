@@ -0,0 +1,260 @@
+import os
+import sqlite3
+from array import array
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Sequence, Set, Dict, Any, Optional
+from all_seeing_eye.lib.app import Item
+from all_seeing_eye.lib.normalize import normalize
+from all_seeing_eye.plugins.matcher.matcher import Matcher
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    location TEXT NOT NULL,
+    display TEXT NOT NULL,
+    search TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_path ON items (path);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    key TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS grams (
+    gram TEXT PRIMARY KEY,
+    df INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS postings (
+    gram TEXT NOT NULL,
+    ids BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS postings_gram ON postings (gram);
+"""
+
+
+def ngrams(text: str, n: int = 3) -> Set[str]:
+    """
+    Return the set of character n-grams of a normalized text, i.e. of the
+    search form of an item or a normalized query
+
+    :param      text:  The text
+    :type       text:  str
+    :param      n:     The length of the grams
+    :type       n:     int
+
+    :returns:   The distinct n-grams
+    :rtype:     Set[str]
+    """
+    return {text[i:i+n] for i in range(len(text) - n + 1)}
+
+
+@dataclass
+class Index:
+    """
+    On-disk inverted index from character n-grams to the items containing
+    them. Posting lists are stored as arrays of item ids, one row per gram
+    and flushed batch.
+    """
+    path: str
+    n: int = 3
+    batch_size: int = 100000
+    # the removed items whose ids are still in the posting lists, counted
+    # since the index was opened
+    stale: int = field(default=0, init=False)
+    db: sqlite3.Connection = field(init=False, repr=False)
+
+    def __post_init__(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    def __len__(self) -> int:
+        return int(self.db.execute("SELECT COUNT(*) FROM items").fetchone()[0])
+
+    def clear(self):
+        with self.db:
+            self.db.execute("DELETE FROM files")
+            self.db.execute("DELETE FROM items")
+            self.db.execute("DELETE FROM grams")
+            self.db.execute("DELETE FROM postings")
+
+    def key(self, path: str) -> Optional[str]:
+        """
+        Return the key the items of a file were indexed with
+
+        :param      path:  The path of the file
+        :type       path:  str
+
+        :returns:   The key or None if the file is not indexed
+        :rtype:     Optional[str]
+        """
+        row = self.db.execute("SELECT key FROM files WHERE path = ?", (path,)).fetchone()
+        return None if row is None else str(row[0])
+
+    def update(self, path: str, key: str, items: Iterable[Item]) -> int:
+        """
+        Replace the items of a file
+
+        :param      path:   The path of the file
+        :type       path:   str
+        :param      key:    The key identifying contents and extraction settings
+        :type       key:    str
+        :param      items:  The items of the file
+        :type       items:  Iterable[Item]
+
+        :returns:   The number of items added
+        :rtype:     int
+        """
+        self.remove(path)
+        count = self.add(items)
+        with self.db:
+            self.db.execute("INSERT INTO files (path, key) VALUES (?, ?)", (path, key))
+        return count
+
+    def remove(self, path: str):
+        """
+        Remove the items of a file. The document frequencies of their grams
+        are lowered at once, their ids stay in the posting lists until the
+        next compaction, candidates without item are skipped.
+        """
+        with self.db:
+            dfs = Counter(gram for (search,) in self.db.execute("SELECT search FROM items WHERE path = ?", (path,))
+                          for gram in ngrams(search, self.n))
+            self.db.executemany("UPDATE grams SET df = df - ? WHERE gram = ?", ((df, gram) for (gram, df) in dfs.items()))
+            self.db.execute("DELETE FROM grams WHERE df <= 0")
+            self.db.execute("DELETE FROM files WHERE path = ?", (path,))
+            self.stale += self.db.execute("DELETE FROM items WHERE path = ?", (path,)).rowcount
+
+    def prune(self, paths: Iterable[str]) -> int:
+        """
+        Remove the items of all files not in paths
+
+        :param      paths:  The paths to keep
+        :type       paths:  Iterable[str]
+
+        :returns:   The number of removed files
+        :rtype:     int
+        """
+        stale = {path for (path,) in self.db.execute("SELECT path FROM files")} - set(paths)
+        for path in stale:
+            self.remove(path)
+        return len(stale)
+
+    def compact_stale(self, ratio: float = 0.25) -> bool:
+        """
+        Compact the index once the removed items still in the posting lists
+        are more than ratio of the items, such that a long-running watcher
+        does not grow the index without bound
+
+        :param      ratio:  The share of removed items
+        :type       ratio:  float
+
+        :returns:   True if the index was compacted
+        :rtype:     bool
+        """
+        if self.stale <= ratio * len(self):
+            return False
+        self.compact()
+        return True
+
+    def compact(self):
+        """
+        Rebuild the posting lists from the items, dropping removed ids
+        """
+        self.stale = 0
+        postings: Dict[str, Any] = defaultdict(lambda: array('I'))
+        with self.db:
+            self.db.execute("DELETE FROM grams")
+            self.db.execute("DELETE FROM postings")
+            for (count, (id, search)) in enumerate(self.db.execute("SELECT id, search FROM items ORDER BY id").fetchall(), 1):
+                for gram in ngrams(search, self.n):
+                    postings[gram].append(id)
+                if count % self.batch_size == 0:
+                    self.flush(postings)
+            self.flush(postings)
+        self.db.execute("VACUUM")
+
+    def add(self, items: Iterable[Item]) -> int:
+        """
+        Add items to the index
+
+        :param      items:  The items
+        :type       items:  Iterable[Item]
+
+        :returns:   The number of items added
+        :rtype:     int
+        """
+        postings: Dict[str, Any] = defaultdict(lambda: array('I'))
+        count = 0
+        with self.db:
+            for item in items:
+                cursor = self.db.execute("INSERT INTO items (path, location, display, search) VALUES (?, ?, ?, ?)",
+                                         (item.path, item.where, item.term.get('display'), item.term.get('search')))
+                for gram in ngrams(item.term.get('search', ''), self.n):
+                    postings[gram].append(cursor.lastrowid)
+                count += 1
+                if count % self.batch_size == 0:
+                    self.flush(postings)
+            self.flush(postings)
+        return count
+
+    def flush(self, postings: Dict[str, Any]):
+        self.db.executemany("INSERT INTO postings (gram, ids) VALUES (?, ?)",
+                            ((gram, ids.tobytes()) for (gram, ids) in postings.items()))
+        self.db.executemany("INSERT INTO grams (gram, df) VALUES (?, ?) "
+                            "ON CONFLICT (gram) DO UPDATE SET df = df + excluded.df",
+                            ((gram, len(ids)) for (gram, ids) in postings.items()))
+        postings.clear()
+
+    def candidates(self, query: str, threshold: int, matcher: Matcher) -> Iterator[Item]:
+        """
+        Return the items that may score at least threshold for the query.
+
+        A term that lacks at most k of the query's distinct n-grams to score
+        at least threshold, see Matcher.missing_grams(), contains at least
+        one of the k+1 rarest query grams and only their posting lists are
+        read. Without such a bound, or if the query has too few grams, all
+        items are candidates.
+
+        :param      query:      The query
+        :type       query:      str
+        :param      threshold:  The score threshold from 0 to 100
+        :type       threshold:  int
+        :param      matcher:    The matcher scoring the candidates
+        :type       matcher:    Matcher
+
+        :returns:   The candidate items in insertion order
+        :rtype:     Iterator[Item]
+        """
+        query = normalize(query)
+        grams = ngrams(query, self.n)
+        missing = matcher.missing_grams(query, threshold, self.n)
+        if missing is None or len(grams) <= missing:
+            yield from self.items("SELECT path, location, display, search FROM items ORDER BY id")
+            return
+
+        dfs = dict(self.db.execute(f"SELECT gram, df FROM grams WHERE gram IN ({','.join('?' * len(grams))})", list(grams)))
+        rarest = sorted(grams, key=lambda gram: dfs.get(gram, 0))[:missing + 1]
+        ids: Set[int] = set()
+        for (blob,) in self.db.execute(f"SELECT ids FROM postings WHERE gram IN ({','.join('?' * len(rarest))})", rarest):
+            ids.update(array('I', blob))
+
+        ordered = sorted(ids)
+        for i in range(0, len(ordered), 500):
+            chunk = ordered[i:i+500]
+            yield from self.items(f"SELECT path, location, display, search FROM items "
+                                  f"WHERE id IN ({','.join('?' * len(chunk))}) ORDER BY id", chunk)
+
+    def items(self, sql: str, params: Sequence[Any] = ()) -> Iterator[Item]:
+        return (Item(path, where, {'display': display, 'search': search})
+                for (path, where, display, search) in self.db.execute(sql, params))
@@ -0,0 +1,42 @@
+import re
+import unicodedata
+
+# changes of normalize() change the search form of cached items
+VERSION = 1
+
+HYPHENATED = re.compile(r'(?<=[^\W\d_])[-\u2010]\s+(?=[^\W\d_])')
+SOFT_HYPHEN = '\u00ad'
+NON_WORD = re.compile(r'\W+')
+# maps the ASCII characters matched by NON_WORD to spaces
+ASCII_NON_WORD = str.maketrans({chr(c): ' ' for c in range(128) if NON_WORD.match(chr(c))})
+
+
+def dehyphenate(match: 're.Match[str]') -> str:
+    # "exam- ple" is a word broken at the end of a line, "Jean- Paul" is not
+    following = match.string[match.end()]
+    return '' if following.islower() else match.group()
+
+
+def normalize(text: str) -> str:
+    """
+    Return the search form of a text, computed once when the text is
+    extracted: ligatures and other compatibility characters are replaced
+    (NFKC), words hyphenated at line breaks are joined, the text is case
+    folded and everything that is not a word character collapses into
+    single spaces, like the matchers used to preprocess every comparison.
+    The same is done to queries, so the matchers compare both as they are.
+
+    :param      text:  The text
+    :type       text:  str
+
+    :returns:   The normalized text
+    :rtype:     str
+    """
+    if text.isascii():
+        # the same without the regular expressions, ASCII is NFKC already
+        if '-' in text:
+            text = HYPHENATED.sub(dehyphenate, text)
+        return ' '.join(text.lower().translate(ASCII_NON_WORD).split())
+    text = unicodedata.normalize('NFKC', text.replace(SOFT_HYPHEN, ''))
+    text = HYPHENATED.sub(dehyphenate, text)
+    return NON_WORD.sub(' ', text.casefold()).strip()
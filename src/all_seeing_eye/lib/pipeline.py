@@ -0,0 +1,179 @@
+import queue
+import threading
+from contextlib import closing
+from dataclasses import dataclass, field
+from itertools import groupby
+from operator import attrgetter
+from typing import Any, Callable, Dict, Generator, Iterable, List, Optional, Set, Tuple
+from all_seeing_eye.lib.app import SearchConfig, Match
+
+
+class Done:
+    """
+    Marks the end of the input of a stage
+    """
+
+
+@dataclass
+class Failed:
+    """
+    Carries an exception of a stage to the caller
+    """
+    error: BaseException
+
+
+@dataclass
+class Pipeline:
+    """
+    Searches files in stages that run in threads connected by bounded queues,
+    such that reading files, extracting their items and scoring overlap:
+
+    1. prefetch: computes the digest of a file and, unless the file is
+       cached, reads it once such that the PDF library finds it in the page
+       cache
+    2. extract: one or more extractors iterate the segments of a file and
+       pass them on in batches of one location
+    3. score: scores the batches and collects the matches of every file
+
+    A full queue blocks the stage before it, so at most prefetch files are
+    read ahead and at most batches batches wait for scoring. Every extractor
+    has its own config, as PDF plugins hold the open document.
+
+        pipeline = Pipeline(config, "query", 70)
+        for (path, matches) in pipeline.search(config.files):
+            ...
+    """
+    config: SearchConfig
+    query: str
+    threshold: int
+    brk: bool = False
+    prefetch: int = 4
+    extractors: int = 1
+    batches: int = 64
+    block_size: int = 1 << 20
+    stop: threading.Event = field(default_factory=threading.Event, init=False, repr=False)
+    found: Set[str] = field(default_factory=set, init=False, repr=False)
+
+    def search(self, files: Iterable[str]) -> Generator[Tuple[str, List[Match]], None, None]:
+        """
+        Yield the path and the matches of every file. With one extractor the
+        files are yielded in order, otherwise in the order they are done.
+        Closing the iterator stops all stages.
+
+        :param      files:  The paths of the files
+        :type       files:  Iterable[str]
+
+        :returns:   The path and the matches of every file
+        :rtype:     Generator[Tuple[str, List[Match]], None, None]
+        """
+        self.stop.clear()
+        self.found.clear()
+        prefetched: 'queue.Queue[Any]' = queue.Queue(self.prefetch)
+        extracted: 'queue.Queue[Any]' = queue.Queue(self.batches)
+        scored: 'queue.Queue[Any]' = queue.Queue()
+        configs = [self.config] if self.extractors == 1 else \
+            [SearchConfig(**self.config.settings()) for _ in range(self.extractors)]
+        for config in configs:
+            config.stats = self.config.stats
+
+        threads = [threading.Thread(target=self.stage, args=(self.read, files, prefetched), daemon=True)]
+        threads += [threading.Thread(target=self.stage, args=(self.extract, (prefetched, config), extracted), daemon=True)
+                    for config in configs]
+        threads += [threading.Thread(target=self.stage, args=(self.score, extracted, scored), daemon=True)]
+        for thread in threads:
+            thread.start()
+        try:
+            while (result := self.get(scored)) is not None:
+                yield result
+        finally:
+            self.stop.set()
+            for thread in threads:
+                thread.join()
+
+    def stage(self, run: Callable[[Any, 'queue.Queue[Any]'], None], source: Any, sink: 'queue.Queue[Any]'):
+        """
+        Run a stage, its errors and those of the stages before it are passed
+        on until they reach the caller
+        """
+        try:
+            run(source, sink)
+        except BaseException as e:
+            self.put(sink, Failed(e))
+
+    def put(self, sink: 'queue.Queue[Any]', message: Any) -> bool:
+        """
+        Wait until there is room in the queue or the pipeline is stopped
+
+        :returns:   False if the pipeline was stopped
+        """
+        while not self.stop.is_set():
+            try:
+                sink.put(message, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def get(self, source: 'queue.Queue[Any]') -> Any:
+        """
+        Wait for the next message, None if the pipeline was stopped or the
+        input is done
+
+        :raises     BaseException:  The exception of a failed stage
+        """
+        while not self.stop.is_set():
+            try:
+                message = source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if isinstance(message, Failed):
+                raise message.error
+            return None if isinstance(message, Done) else message
+        return None
+
+    def read(self, files: Iterable[str], sink: 'queue.Queue[Any]'):
+        from all_seeing_eye.ase import PdfDocument
+        for path in files:
+            if not PdfDocument(path, self.config).cached:
+                with open(path, 'rb') as handle:
+                    while not self.stop.is_set() and handle.read(self.block_size):
+                        pass
+            if not self.put(sink, path):
+                return
+        for _ in range(self.extractors):
+            self.put(sink, Done())
+
+    def extract(self, source: Tuple['queue.Queue[Any]', SearchConfig], sink: 'queue.Queue[Any]'):
+        from all_seeing_eye.ase import PdfSegments
+        (prefetched, config) = source
+        while (path := self.get(prefetched)) is not None:
+            with closing(PdfSegments(path, config).__iter__()) as items:
+                for (where, group) in groupby(items, key=attrgetter('where')):
+                    if path in self.found or not self.put(sink, (path, list(group))):
+                        break
+            if not self.put(sink, (path, None)):
+                return
+        self.put(sink, Done())
+
+    def score(self, source: 'queue.Queue[Any]', sink: 'queue.Queue[Any]'):
+        from all_seeing_eye.ase import score
+        matches: Dict[str, List[Match]] = {}
+        done = 0
+        while done < self.extractors:
+            message: Optional[Tuple[str, Any]] = self.get(source)
+            if message is None:
+                if self.stop.is_set():
+                    return
+                done += 1
+                continue
+            (path, items) = message
+            if items is None:
+                if not self.put(sink, (path, matches.pop(path, []))):
+                    return
+            elif path not in self.found:
+                found = matches.setdefault(path, [])
+                found.extend(score(items, self.config, self.query, self.threshold))
+                if self.brk and found:
+                    del found[1:]
+                    self.found.add(path)
+        self.put(sink, Done())
@@ -0,0 +1,229 @@
+import copy
+import json
+import random
+import threading
+from functools import wraps
+from contextlib import contextmanager
+from time import perf_counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Generator, Iterator, List, Optional, Sequence, TextIO, TypeVar
+
+T = TypeVar('T')
+
+PERCENTILES = (50, 90, 99)
+
+
+@dataclass
+class Site:
+    """
+    The latencies of one call site. Percentiles are estimated from a uniform
+    sample of at most size calls, such that memory stays bounded.
+    """
+    calls: int = 0
+    seconds: float = 0.0
+    slowest: float = 0.0
+    samples: List[float] = field(default_factory=list, repr=False)
+    size: int = field(default=10000, repr=False)
+
+    def add(self, seconds: float):
+        self.calls += 1
+        self.seconds += seconds
+        self.slowest = max(self.slowest, seconds)
+        if len(self.samples) < self.size:
+            self.samples.append(seconds)
+        elif (i := random.randrange(self.calls)) < self.size:
+            self.samples[i] = seconds
+
+    def merge(self, other: 'Site'):
+        total = self.calls + other.calls
+        if total == 0:
+            return
+        # keep both samples in proportion to the calls they stand for
+        mine = round(self.size * self.calls / total)
+        self.samples = random.sample(self.samples, min(mine, len(self.samples))) + \
+            random.sample(other.samples, min(self.size - mine, len(other.samples)))
+        self.calls = total
+        self.seconds += other.seconds
+        self.slowest = max(self.slowest, other.slowest)
+
+    def percentile(self, p: int) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'seconds': self.seconds,
+            'mean': self.seconds / self.calls if self.calls else 0.0,
+            **{f'p{p}': self.percentile(p) for p in PERCENTILES},
+            'max': self.slowest,
+        }
+
+
+@dataclass
+class Profile:
+    """
+    Collects the latencies of the plugin call sites, the hits and misses of
+    the caches and the time spent on every file. It is shared by the threads
+    of a search; worker processes send theirs to the parent to be merged.
+
+        profile = Profile()
+        tokenizer = profile.instrument(tokenizer, 'Tokenizer', ['tokenize'])
+        with profile.timed('PdfDocument.store', path):
+            ...
+        profile.cache('chunks', hit=True)
+        profile.write_table(sys.stderr)
+    """
+    sites: Dict[str, Site] = field(default_factory=dict)
+    caches: Dict[str, List[int]] = field(default_factory=dict)
+    files: Dict[str, float] = field(default_factory=dict)
+    lock: Any = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {k: v for (k, v) in self.__dict__.items() if k != 'lock'}
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__dict__.update(state, lock=threading.Lock())
+
+    def record(self, site: str, seconds: float, path: Optional[str] = None):
+        """
+        Record one call of a site
+
+        :param      site:     The name of the call site
+        :type       site:     str
+        :param      seconds:  The duration of the call
+        :type       seconds:  float
+        :param      path:     The file the time is spent on, if it counts
+                              towards the time of the file
+        :type       path:     Optional[str]
+        """
+        with self.lock:
+            self.sites.setdefault(site, Site()).add(seconds)
+            if path is not None:
+                self.files[path] = self.files.get(path, 0.0) + seconds
+
+    def cache(self, name: str, hit: bool):
+        with self.lock:
+            self.caches.setdefault(name, [0, 0])[0 if hit else 1] += 1
+
+    @contextmanager
+    def timed(self, site: str, path: Optional[str] = None):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(site, perf_counter() - start, path)
+
+    def iterate(self, site: str, items: Iterator[T], path: Optional[str] = None) -> Generator[T, None, None]:
+        """
+        Yield the items, recording the time spent producing all of them as
+        one call. The time the consumer spends between items is not counted.
+        """
+        seconds = 0.0
+        try:
+            while True:
+                start = perf_counter()
+                try:
+                    item = next(items)
+                except StopIteration:
+                    return
+                finally:
+                    seconds += perf_counter() - start
+                yield item
+        finally:
+            if hasattr(items, 'close'):
+                items.close()
+            self.record(site, seconds, path)
+
+    def instrument(self, plugin: T, kind: str, methods: Sequence[str]) -> T:
+        """
+        Return a copy of a plugin whose methods record their calls as
+        kind.method. Calls of the plugin to its own methods are recorded as
+        well, the shared plugin instance is left as it is.
+
+        :param      plugin:   The plugin instance
+        :type       plugin:   Plugin
+        :param      kind:     The kind of plugin, e.g. Pdf
+        :type       kind:     str
+        :param      methods:  The names of the methods to time
+        :type       methods:  Sequence[str]
+
+        :returns:   The instrumented copy
+        :rtype:     Plugin
+        """
+        clone = copy.copy(plugin)
+        for name in methods:
+            method = getattr(clone, name)
+
+            @wraps(method)
+            def timed(*args, method=method, site=f'{kind}.{name}', **kwargs):
+                start = perf_counter()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    self.record(site, perf_counter() - start)
+
+            setattr(clone, name, timed)
+        return clone
+
+    def take(self) -> 'Profile':
+        """
+        Return what was collected so far and start over, e.g. to send a
+        worker's profile to the parent after every unit of work
+        """
+        with self.lock:
+            taken = Profile(self.sites, self.caches, self.files)
+            (self.sites, self.caches, self.files) = ({}, {}, {})
+        return taken
+
+    def merge(self, other: 'Profile'):
+        with self.lock:
+            for (site, stats) in other.sites.items():
+                self.sites.setdefault(site, Site()).merge(stats)
+            for (name, (hits, misses)) in other.caches.items():
+                counts = self.caches.setdefault(name, [0, 0])
+                counts[0] += hits
+                counts[1] += misses
+            for (path, seconds) in other.files.items():
+                self.files[path] = self.files.get(path, 0.0) + seconds
+
+    def summary(self, slowest: int = 10) -> Dict[str, Any]:
+        """
+        Return the statistics as plain data
+
+        :param      slowest:  The number of slowest files
+        :type       slowest:  int
+
+        :returns:   The sites, caches and slowest files
+        :rtype:     Dict[str, Any]
+        """
+        with self.lock:
+            return {
+                'sites': {site: stats.summary() for (site, stats) in sorted(self.sites.items())},
+                'caches': {name: {'hits': hits, 'misses': misses, 'ratio': hits / (hits + misses) if hits + misses else 0.0}
+                           for (name, (hits, misses)) in sorted(self.caches.items())},
+                'slowest_files': [{'path': path, 'seconds': seconds}
+                                  for (path, seconds) in sorted(self.files.items(), key=lambda x: -x[1])[:slowest]],
+            }
+
+    def write_json(self, handle: TextIO):
+        json.dump(self.summary(), handle, indent=4)
+        handle.write('\n')
+
+    def write_table(self, handle: TextIO):
+        summary = self.summary()
+        ms = [f'p{p}' for p in PERCENTILES] + ['mean', 'max']
+        rows = [['site', 'calls', 'total s'] + [f'{k} ms' for k in ms]]
+        rows += [[site, str(s['calls']), f"{s['seconds']:.3f}"] + [f'{s[k] * 1000:.3f}' for k in ms]
+                 for (site, s) in summary['sites'].items()]
+        rows += [[]] + [['cache', 'hits', 'misses', 'ratio']]
+        rows += [[name, str(c['hits']), str(c['misses']), f"{c['ratio']:.1%}"] for (name, c) in summary['caches'].items()]
+        rows += [[]] + [['file', 'total s']]
+        rows += [[f['path'], f"{f['seconds']:.3f}"] for f in summary['slowest_files']]
+        width = max((len(row[0]) for row in rows if row), default=0)
+        for row in rows:
+            if row:
+                handle.write(row[0].ljust(width) + ''.join(cell.rjust(12) for cell in row[1:]))
+            handle.write('\n')
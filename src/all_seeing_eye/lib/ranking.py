@@ -0,0 +1,200 @@
+import re
+import heapq
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from all_seeing_eye.lib.app import Match
+from all_seeing_eye.lib.normalize import normalize
+
+# the bounded sum adds at most BONUS points to the best score, half of it
+# for K1 further perfect matches, like the term frequency saturation of BM25
+BONUS = 10.0
+K1 = 1.2
+PAGE = re.compile(r'page (\d+)/')
+WORD = re.compile(r'\w+')
+
+
+def aggregate(scores: Iterable[int]) -> float:
+    """
+    Return the score of a group of matches: the best score plus a bounded
+    sum of the others, such that many good matches rank above a single one
+    that is slightly better, while any number of matches adds BONUS at most
+
+    :param      scores:  The scores of the matches from 0 to 100
+    :type       scores:  Iterable[int]
+
+    :returns:   The score from 0 to 100 + BONUS
+    :rtype:     float
+    """
+    ordered = sorted(scores, reverse=True)
+    if not ordered:
+        return 0.0
+    rest = sum(ordered[1:]) / 100
+    return ordered[0] + BONUS * rest / (rest + K1)
+
+
+def snippet(text: str, query: str, width: int = 160, mark: Tuple[str, str] = ('*', '*')) -> str:
+    """
+    Return the part of a text around its first word matching the query,
+    with all such words highlighted. A word matches if its normalized form
+    is a query word, or one starts with the other and has 4 characters at
+    least, e.g. "search" and "searches".
+
+    :param      text:   The text, e.g. the display form of an item
+    :type       text:   str
+    :param      query:  The query
+    :type       query:  str
+    :param      width:  The maximum length of the snippet without the marks
+    :type       width:  int
+    :param      mark:   The strings put before and after a matching word
+    :type       mark:   Tuple[str, str]
+
+    :returns:   The snippet
+    :rtype:     str
+    """
+    query_words = set(normalize(query).split())
+
+    def matches(word: str) -> bool:
+        word = normalize(word)
+        return word in query_words or any(min(len(word), len(q)) >= 4 and (word.startswith(q) or q.startswith(word))
+                                          for q in query_words)
+
+    spans = [(m.start(), m.end()) for m in WORD.finditer(text) if matches(m.group())]
+    start = max(0, spans[0][0] - width // 3) if spans else 0
+    if start > 0:
+        # do not cut a word
+        start = text.find(' ', start, spans[0][0]) + 1 or start
+    stop = min(len(text), start + width)
+    if stop < len(text):
+        space = text.rfind(' ', start + 1, stop)
+        stop = space if space > 0 else stop
+
+    parts = ['… '] if start > 0 else []
+    position = start
+    for (begin, end) in spans:
+        if begin >= position and end <= stop:
+            parts += [text[position:begin], mark[0], text[begin:end], mark[1]]
+            position = end
+    parts.append(text[position:stop])
+    if stop < len(text):
+        parts.append(' …')
+    return ''.join(parts).strip()
+
+
+@dataclass
+class Page:
+    """
+    The matches of a document on one page, None is the number of the
+    metadata
+    """
+    number: Optional[int]
+    matches: List[Match] = field(default_factory=list)
+
+    @property
+    def best(self) -> Match:
+        return max(self.matches, key=lambda match: match.score)
+
+    @property
+    def score(self) -> float:
+        return aggregate(match.score for match in self.matches)
+
+
+@dataclass
+class Document:
+    """
+    The matches of a file grouped by page. A sentence occurring again, e.g.
+    in a header repeated on every page, only counts once.
+    """
+    path: str
+    pages: Dict[Optional[int], Page] = field(default_factory=dict)
+    seen: Set[str] = field(default_factory=set, repr=False)
+    duplicates: int = 0
+
+    def add(self, match: Match):
+        term = match.item.term
+        key = term.get('search', term.get('display', ''))
+        if key in self.seen:
+            self.duplicates += 1
+            return
+        self.seen.add(key)
+        page = PAGE.search(match.item.where)
+        number = None if page is None else int(page.group(1))
+        self.pages.setdefault(number, Page(number)).matches.append(match)
+
+    @property
+    def score(self) -> float:
+        return aggregate(match.score for page in self.pages.values() for match in page.matches)
+
+    def ranked_pages(self) -> List[Page]:
+        """
+        Return the pages ordered by descending score, ties by page number
+        """
+        return sorted(self.pages.values(), key=lambda page: (-page.score, page.number or 0))
+
+
+@dataclass
+class Ranking:
+    """
+    Ranks the files by their matches, see aggregate(). Snippets are only
+    built for the results that are shown, however many matches there are.
+    """
+    query: str
+    documents: Dict[str, Document] = field(default_factory=dict)
+
+    def add(self, matches: Iterable[Match]) -> 'Ranking':
+        """
+        Add matches of any files
+
+        :param      matches:  The matches
+        :type       matches:  Iterable[Match]
+
+        :returns:   This ranking
+        :rtype:     Ranking
+        """
+        for match in matches:
+            document = self.documents.get(match.item.path)
+            if document is None:
+                document = self.documents[match.item.path] = Document(match.item.path)
+            document.add(match)
+        return self
+
+    def top(self, n: Optional[int] = None) -> List[Document]:
+        """
+        Return the best n documents, or all, ordered by descending score, ties
+        by the order they were added in
+
+        :param      n:    The number of documents
+        :type       n:    Optional[int]
+
+        :returns:   The documents
+        :rtype:     List[Document]
+        """
+        scored = [(-document.score, i, document) for (i, document) in enumerate(self.documents.values())]
+        best = heapq.nsmallest(n, scored) if n is not None else sorted(scored)
+        return [document for (_, _, document) in best]
+
+    def lines(self, n: Optional[int] = None, pages: int = 3, width: int = 160,
+              mark: Tuple[str, str] = ('*', '*')) -> Iterator[str]:
+        """
+        Return the report of the best n documents: a line per document and a
+        snippet of the best match on each of its best pages
+
+        :param      n:      The number of documents
+        :type       n:      Optional[int]
+        :param      pages:  The number of pages shown per document
+        :type       pages:  int
+        :param      width:  The maximum length of a snippet, see snippet()
+        :type       width:  int
+        :param      mark:   The highlighting of matching words
+        :type       mark:   Tuple[str, str]
+
+        :returns:   The lines
+        :rtype:     Iterator[str]
+        """
+        for (rank, document) in enumerate(self.top(n), 1):
+            count = sum(len(page.matches) for page in document.pages.values())
+            repeated = f', {document.duplicates} repeated' if document.duplicates else ''
+            yield f'{rank}. {document.path} ({document.score:.1f}, {count} matches on {len(document.pages)} pages{repeated})'
+            for page in document.ranked_pages()[:pages]:
+                best = page.best
+                text = snippet(best.item.term.get('display', ''), self.query, width, mark)
+                yield f'   {best.item.where} ({best.score}): {text}'
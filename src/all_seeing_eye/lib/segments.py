@@ -0,0 +1,68 @@
+import os
+import sqlite3
+import threading
+from functools import lru_cache
+from dataclasses import dataclass
+from typing import Optional
+from all_seeing_eye.plugins.segmentizer.segmentizer import Segmentizer
+from all_seeing_eye.lib.profile import Profile
+
+
+@dataclass
+class SegmentCache:
+    """
+    Memoizes a segmentizer. The most recently used results are kept in
+    memory, all results in an SQLite database in cache_dir that is shared by
+    runs and worker processes. With a profile, the hits of both are counted.
+    """
+    segmentizer: Segmentizer
+    cache_dir: Optional[str] = None
+    maxsize: int = 1 << 16
+    profile: Optional[Profile] = None
+
+    def __post_init__(self):
+        cls = self.segmentizer.__class__
+        self.name = f'{cls.__module__}.{cls.__name__}'
+        self.db: Optional[sqlite3.Connection] = None
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # autocommit, every result is stored right away; the pipeline
+            # segments in another thread than the one creating the config
+            self.db = sqlite3.connect(os.path.join(self.cache_dir, 'segments.sqlite'), timeout=60,
+                                      isolation_level=None, check_same_thread=False)
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.execute('PRAGMA synchronous=NORMAL')
+            self.db.execute('CREATE TABLE IF NOT EXISTS segments '
+                            '(segmentizer TEXT, text TEXT, segmented TEXT, PRIMARY KEY (segmentizer, text)) WITHOUT ROWID')
+        self.lock = threading.Lock()
+        self.cached = lru_cache(maxsize=self.maxsize)(self.lookup)
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def segment(self, sentence: str) -> str:
+        """
+        Segmentize a sentence, see Segmentizer.segment()
+        """
+        with self.lock:
+            if self.profile is None:
+                return str(self.cached(sentence))
+            hits = self.cached.cache_info().hits
+            segmented = str(self.cached(sentence))
+            self.profile.cache('segments (memory)', self.cached.cache_info().hits > hits)
+            return segmented
+
+    def lookup(self, sentence: str) -> str:
+        if self.db is not None:
+            row = self.db.execute('SELECT segmented FROM segments WHERE segmentizer = ? AND text = ?',
+                                  (self.name, sentence)).fetchone()
+            if self.profile is not None:
+                self.profile.cache('segments (sqlite)', row is not None)
+            if row is not None:
+                return str(row[0])
+        segmented = self.segmentizer.segment(sentence)
+        if self.db is not None:
+            self.db.execute('INSERT OR REPLACE INTO segments VALUES (?, ?, ?)', (self.name, sentence, segmented))
+        return segmented
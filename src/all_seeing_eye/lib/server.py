@@ -0,0 +1,85 @@
+import os
+import json
+import socket
+from typing import Any, Callable, Dict, Optional
+
+DEFAULT_SOCKET = '~/.cache/ase/ase.sock'
+
+
+def is_running(path: Optional[str]) -> bool:
+    """
+    Return whether a server accepts connections on the socket
+
+    :param      path:  The path of the Unix socket, None for the default
+    :type       path:  Optional[str]
+
+    :returns:   True if a server is running
+    :rtype:     bool
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(os.path.expanduser(path or DEFAULT_SOCKET))
+        return True
+    except OSError:
+        return False
+
+
+def serve(path: Optional[str], answer: Callable[[Dict[str, Any]], Dict[str, Any]]):
+    """
+    Answer requests on a Unix socket until interrupted. Every request and
+    every response is one line of JSON, a connection may send many requests.
+
+    :param      path:    The path of the Unix socket
+    :type       path:    Optional[str]
+    :param      answer:  Returns the response to a request
+    :type       answer:  Function
+
+    :raises     Exception:  If another server is running on the socket
+    """
+    import socketserver
+    path = os.path.expanduser(path or DEFAULT_SOCKET)
+    if os.path.exists(path):
+        if is_running(path):
+            raise Exception(f'Another server is running on {path}')
+        os.remove(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                try:
+                    response = answer(json.loads(line))
+                except Exception as e:
+                    response = {'error': f'{e.__class__.__name__}: {e}'}
+                self.wfile.write(json.dumps(response).encode() + b'\n')
+
+    with socketserver.UnixStreamServer(path, Handler) as server:
+        try:
+            server.serve_forever()
+        finally:
+            os.remove(path)
+
+
+def request(path: Optional[str], payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Send one request to the server
+
+    :param      path:     The path of the Unix socket
+    :type       path:     Optional[str]
+    :param      payload:  The request
+    :type       payload:  Dict[str, Any]
+
+    :returns:   The response
+    :rtype:     Dict[str, Any]
+
+    :raises     OSError:    If no server is running on the socket
+    :raises     Exception:  If the server failed to answer
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(os.path.expanduser(path or DEFAULT_SOCKET))
+        sock.sendall(json.dumps(payload).encode() + b'\n')
+        with sock.makefile('rb') as handle:
+            response = dict(json.loads(handle.readline()))
+    if 'error' in response:
+        raise Exception(response['error'])
+    return response
@@ -0,0 +1,199 @@
+import os
+import sys
+import time
+import select
+import struct
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+# (path, deleted)
+Event = Tuple[str, bool]
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+EVENT = struct.Struct('iIII')
+
+
+@dataclass
+class Inotify:
+    """
+    Minimal ctypes binding of Linux inotify watching directory trees
+    """
+    mask: int = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+                 IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+    watches: Dict[int, str] = field(default_factory=dict)
+
+    def __post_init__(self):
+        """
+        :raises     OSError:  If inotify is not available
+        """
+        if not sys.platform.startswith('linux'):
+            raise OSError('inotify is only available on Linux')
+        import ctypes
+        import ctypes.util
+        self.libc: Any = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.get_errno = ctypes.get_errno
+
+    def close(self):
+        os.close(self.fd)
+
+    def add(self, directory: str):
+        for (root, dirs, files) in os.walk(directory):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(root), self.mask)
+            if wd < 0:
+                raise OSError(self.get_errno(), f'inotify_add_watch failed for {root}')
+            self.watches[wd] = root
+
+    def read(self, timeout: Optional[float]) -> List[Tuple[str, int]]:
+        """
+        Return the (path, mask) of the events arriving within timeout
+        """
+        (ready, _, _) = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        data = os.read(self.fd, 1 << 16)
+        events = []
+        offset = 0
+        while offset < len(data):
+            (wd, mask, cookie, length) = EVENT.unpack_from(data, offset)
+            name = os.fsdecode(data[offset+EVENT.size:offset+EVENT.size+length].rstrip(b'\0'))
+            offset += EVENT.size + length
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+            elif mask & IN_Q_OVERFLOW or wd in self.watches:
+                events.append((os.path.join(self.watches.get(wd, ''), name), mask))
+        return events
+
+
+@dataclass
+class Watcher:
+    """
+    Watches directories for added, modified and deleted PDF files. Uses
+    inotify where available and polls the directories otherwise.
+    """
+    directories: List[str]
+    debounce: float = 1.0
+    interval: float = 2.0
+    polling: bool = False
+    known: Dict[str, Tuple[int, int, int]] = field(default_factory=dict, repr=False)
+    inotify: Optional[Inotify] = field(default=None, repr=False)
+
+    def __post_init__(self):
+        self.directories = [os.path.expanduser(d) for d in self.directories]
+        if not self.polling:
+            try:
+                self.inotify = Inotify()
+                for directory in self.directories:
+                    self.inotify.add(directory)
+            except OSError:
+                self.inotify = None
+        self.known = self.scan()
+
+    def close(self):
+        if self.inotify is not None:
+            self.inotify.close()
+
+    @staticmethod
+    def is_pdf(path: str) -> bool:
+        return path.lower().endswith('.pdf')
+
+    def scan(self) -> Dict[str, Tuple[int, int, int]]:
+        snapshot = {}
+        for directory in self.directories:
+            for (root, dirs, names) in os.walk(directory):
+                for name in filter(self.is_pdf, names):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    snapshot[path] = (st.st_mtime_ns, st.st_size, st.st_ino)
+        return snapshot
+
+    def rescan(self) -> List[Event]:
+        """
+        Compare the directories with the known files
+        """
+        snapshot = self.scan()
+        events = [(path, False) for (path, stat) in snapshot.items() if self.known.get(path) != stat]
+        events += [(path, True) for path in self.known if path not in snapshot]
+        self.known = snapshot
+        return events
+
+    def below(self, directory: str) -> List[str]:
+        return [path for path in self.known if path.startswith(os.path.join(directory, ''))]
+
+    def translate(self, path: str, mask: int) -> List[Event]:
+        """
+        Turn an inotify event into file events
+        """
+        assert self.inotify is not None
+        if mask & IN_Q_OVERFLOW:
+            return self.rescan()
+        if mask & IN_ISDIR:
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                self.inotify.add(path)
+                return self.rescan()
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                deleted = self.below(path)
+                for p in deleted:
+                    del self.known[p]
+                return [(p, True) for p in deleted]
+            return []
+        if not self.is_pdf(path):
+            return []
+        if mask & (IN_DELETE | IN_MOVED_FROM):
+            self.known.pop(path, None)
+            return [(path, True)]
+        if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                return []
+            self.known[path] = (st.st_mtime_ns, st.st_size, st.st_ino)
+            return [(path, False)]
+        return []
+
+    def read(self, timeout: Optional[float]) -> List[Event]:
+        """
+        Return the file events arriving within timeout, None waits for at
+        least one event
+        """
+        if self.inotify is not None:
+            while True:
+                events = [e for (path, mask) in self.inotify.read(timeout) for e in self.translate(path, mask)]
+                if events or timeout is not None:
+                    return events
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            time.sleep(self.interval if deadline is None else max(0.0, min(self.interval, deadline - time.monotonic())))
+            events = self.rescan()
+            if events or (deadline is not None and time.monotonic() >= deadline):
+                return events
+
+    def batches(self) -> Iterator[Tuple[Set[str], Set[str]]]:
+        """
+        Yield the changed and the deleted files, bursts of events are merged
+        into one batch once no event arrived for the debounce time
+
+        :returns:   The sets of changed and deleted paths
+        :rtype:     Iterator[Tuple[Set[str], Set[str]]]
+        """
+        while True:
+            pending = dict(self.read(None))
+            while events := self.read(self.debounce):
+                pending.update(events)
+            yield ({path for (path, deleted) in pending.items() if not deleted},
+                   {path for (path, deleted) in pending.items() if deleted})
@@ -1,7 +1,15 @@
+from typing import Optional
 from all_seeing_eye.plugins.matcher.matcher import Matcher
 
 
 class Default(Matcher):
+    """
+    Substring search, case-insensitive as terms and query are normalized
+    """
 
-    def score(self, term: str, query: str) -> int:
+    def score(self, term: str, query: str, threshold: int = 0) -> int:
         return 100 if query in term else 0
+
+    def missing_grams(self, query: str, threshold: int, n: int) -> Optional[int]:
+        # a term containing the query contains all of its grams
+        return None if threshold <= 0 else 0
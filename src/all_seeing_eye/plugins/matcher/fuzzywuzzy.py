@@ -1,17 +1,119 @@
+from collections import Counter
+from itertools import islice
+from typing import Iterator, Tuple
 from fuzzywuzzy import fuzz
 from all_seeing_eye.plugins.matcher.matcher import Matcher
 
 
+def length_bound(a: str, b: str) -> float:
+    """
+    Upper bound of fuzz.ratio(a, b) / 100 from the lengths alone: at most
+    the shorter string matches
+    """
+    if not a or not b:
+        return 0.0
+    return 2 * min(len(a), len(b)) / (len(a) + len(b))
+
+
+def window_bound(shorter: str, longer: str, cutoff: float) -> float:
+    """
+    Upper bound of fuzz.partial_ratio(shorter, longer) / 100. partial_ratio
+    compares shorter with windows of len(shorter) characters of longer and
+    with suffixes of longer, a window w sharing at most W characters with
+    shorter scores at most 2W / (len(shorter) + len(w)). Stops early once the
+    bound reaches cutoff.
+    """
+    size = len(shorter)
+    if not size:
+        return 0.0
+    need = Counter(shorter)
+
+    def overlaps(chars: str, window: int) -> Iterator[int]:
+        have: 'Counter[str]' = Counter()
+        overlap = 0
+        for (i, c) in enumerate(chars):
+            if have[c] < need[c]:
+                overlap += 1
+            have[c] += 1
+            if i >= window:
+                old = chars[i - window]
+                have[old] -= 1
+                if have[old] < need[old]:
+                    overlap -= 1
+            yield overlap
+
+    best = 0.0
+    for (i, overlap) in enumerate(overlaps(longer, size)):
+        if i >= size - 1:
+            best = max(best, overlap / size)
+            if best >= cutoff:
+                return best
+    # the suffixes shorter than shorter, growing from the end
+    for (length, overlap) in enumerate(islice(overlaps(longer[::-1], len(longer)), size - 1), 1):
+        best = max(best, 2 * overlap / (size + length))
+    return best
+
+
+def token_strings(term: str, query: str) -> Tuple[str, ...]:
+    """
+    Return the strings fuzz.token_sort_ratio and fuzz.token_set_ratio
+    compare without processing, built the same way
+    """
+    (p1, p2) = (term.strip(), query.strip())
+    (tokens1, tokens2) = (p1.split(), p2.split())
+    sorted1 = " ".join(sorted(tokens1)).strip()
+    sorted2 = " ".join(sorted(tokens2)).strip()
+    if not p1 or not p2:
+        return (sorted1, sorted2)
+    (set1, set2) = (set(tokens1), set(tokens2))
+    sect = " ".join(sorted(set1 & set2))
+    combined_1to2 = (sect + " " + " ".join(sorted(set1 - set2))).strip()
+    combined_2to1 = (sect + " " + " ".join(sorted(set2 - set1))).strip()
+    return (sorted1, sorted2, sect.strip(), combined_1to2, combined_2to1)
+
+
 class FuzzyWuzzy(Matcher):
+    """
+    The best of fuzzywuzzy's ratio, partial_ratio, token_set_ratio and
+    token_sort_ratio. The terms and the query are normalized already, so
+    fuzzywuzzy does not process them again. With a threshold, terms are
+    first checked against upper bounds of the four ratios, which are much
+    cheaper than the ratios, and terms that cannot reach the threshold score
+    0. All other terms get their exact score.
+    """
 
-    def score(self, term: str, query: str) -> int:
+    def score(self, term: str, query: str, threshold: int = 0) -> int:
         if len(term) < len(query):
             return 0
+        if threshold > 0 and not self.may_reach(term, query, threshold):
+            return 0
 
         scores = [
             fuzz.ratio(term, query),
             fuzz.partial_ratio(term, query),
-            fuzz.token_set_ratio(term, query),
-            fuzz.token_sort_ratio(term, query),
+            fuzz.token_set_ratio(term, query, force_ascii=False, full_process=False),
+            fuzz.token_sort_ratio(term, query, force_ascii=False, full_process=False),
         ]
         return int(scores[scores.index(max(scores))])
+
+    def may_reach(self, term: str, query: str, threshold: int) -> bool:
+        """
+        Return False only if no ratio of term and query reaches the threshold.
+        The ratios are rounded, so a ratio reaches it from threshold - 0.5.
+        """
+        cutoff = (threshold - 0.5) / 100 - 1e-9
+        if length_bound(term, query) >= cutoff:
+            return True
+
+        strings = token_strings(term, query)
+        if length_bound(strings[0], strings[1]) >= cutoff:
+            return True
+        if len(strings) > 2:
+            (sect, combined_1to2, combined_2to1) = strings[2:]
+            if max(length_bound(sect, combined_1to2), length_bound(sect, combined_2to1),
+                   length_bound(combined_1to2, combined_2to1)) >= cutoff:
+                return True
+
+        # partial_ratio takes the first string as the shorter one on a tie
+        (shorter, longer) = (term, query) if len(term) <= len(query) else (query, term)
+        return term == query or window_bound(shorter, longer, cutoff) >= cutoff
@@ -1,25 +1,86 @@
 from abc import abstractmethod
+from typing import List, Optional, Sequence, Tuple
 from all_seeing_eye.plugins.plugins import Plugin
 
 
 class Matcher(Plugin):
     """
-    Interface for a Match library
+    Interface for a Match library. Terms and queries are given in their
+    normalized search form, see lib.normalize, so matchers compare them
+    without processing them again.
     """
     _module_name = 'all_seeing_eye.plugins.matcher.fuzzywuzzy'
     _type = 'Match'
 
     @abstractmethod
-    def score(self, term: str, query: str) -> int:
+    def score(self, term: str, query: str, threshold: int = 0) -> int:
         """
-        Return the score of a query in a search term.
+        Return the score of a query in a search term. A score below the
+        threshold may be reported as 0, such that matchers can skip terms
+        that cannot reach it.
 
-        :param      term:   The term
-        :type       term:   str
-        :param      query:  The query
-        :type       query:  str
+        :param      term:       The term
+        :type       term:       str
+        :param      query:      The query
+        :type       query:      str
+        :param      threshold:  The score threshold from 0 to 100
+        :type       threshold:  int
 
         :returns:   The score from 0 to 100.
         :rtype:     int
         """
         pass
+
+    def score_batch(self, terms: Sequence[str], query: str, threshold: int = 0) -> Sequence[int]:
+        """
+        Return the scores of a query in many search terms. Scores below the
+        threshold may be reported as 0.
+
+        :param      terms:      The terms
+        :type       terms:      Sequence[str]
+        :param      query:      The query
+        :type       query:      str
+        :param      threshold:  The score threshold from 0 to 100
+        :type       threshold:  int
+
+        :returns:   The scores from 0 to 100, one per term
+        :rtype:     Sequence[int]
+        """
+        scores: List[int] = [self.score(term, query, threshold) for term in terms]
+        return scores
+
+    def score_queries(self, terms: Sequence[str], queries: Sequence[Tuple[str, int]]) -> List[Sequence[int]]:
+        """
+        Return the scores of many queries in the same search terms, such that
+        matchers can prepare the terms once for all queries. Scores below the
+        threshold of their query may be reported as 0.
+
+        :param      terms:    The terms
+        :type       terms:    Sequence[str]
+        :param      queries:  The queries and their thresholds
+        :type       queries:  Sequence[Tuple[str, int]]
+
+        :returns:   The scores of every query, one per term
+        :rtype:     List[Sequence[int]]
+        """
+        return [self.score_batch(terms, query, threshold) for (query, threshold) in queries]
+
+    def missing_grams(self, query: str, threshold: int, n: int) -> Optional[int]:
+        """
+        Return how many of the distinct n-grams of the query a term may lack
+        and still score at least threshold, such that the search index only
+        reads the terms containing enough of them. The token ratios of the
+        fuzzy matchers compare the words in any order, so a term sharing no
+        n-gram with the query may still match and there is no bound.
+
+        :param      query:      The normalized query
+        :type       query:      str
+        :param      threshold:  The score threshold from 0 to 100
+        :type       threshold:  int
+        :param      n:          The length of the grams
+        :type       n:          int
+
+        :returns:   The number of grams, None if any term may match
+        :rtype:     Optional[int]
+        """
+        return None
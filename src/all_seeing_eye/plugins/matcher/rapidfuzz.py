@@ -0,0 +1,37 @@
+import numpy as np
+from rapidfuzz import fuzz, process
+from all_seeing_eye.plugins.matcher.matcher import Matcher
+
+
+class RapidFuzz(Matcher):
+    """
+    The best of rapidfuzz's ratio, partial_ratio, token_set_ratio and
+    token_sort_ratio of normalized terms and query, computed for a batch of
+    terms at once
+    """
+
+    scorers = (fuzz.ratio, fuzz.partial_ratio, fuzz.token_set_ratio, fuzz.token_sort_ratio)
+
+    def score(self, term: str, query: str, threshold: int = 0) -> int:
+        return int(self.score_batch([term], query, threshold)[0])
+
+    def score_batch(self, terms, query, threshold=0):
+        return self.score_queries(terms, [(query, threshold)])[0]
+
+    def score_queries(self, terms, queries):
+        lengths = np.fromiter(map(len, terms), dtype=np.int64, count=len(terms))
+        return [self.scores(terms, lengths, query, threshold) for (query, threshold) in queries]
+
+    def scores(self, terms, lengths, query, threshold):
+        scores = np.zeros(len(lengths), dtype=np.int32)
+        candidates = np.flatnonzero(lengths >= len(query))
+        if not candidates.size:
+            return scores
+
+        choices = [terms[i] for i in candidates]
+        # a score is rounded, from threshold - 0.5 on it reaches the threshold
+        cutoff = max(0, threshold - 0.5)
+        best = np.max([process.cdist([query], choices, scorer=scorer, processor=None, score_cutoff=cutoff)[0]
+                       for scorer in self.scorers], axis=0)
+        scores[candidates] = np.rint(best)
+        return scores
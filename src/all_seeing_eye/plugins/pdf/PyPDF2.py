@@ -3,6 +3,11 @@ from all_seeing_eye.plugins.pdf.pdf import Pdf
 
 
 class PyPDF2(Pdf):
+    """
+    Pure Python backend. Pages are loaded one at a time by index and the
+    objects parsed for a page are dropped after it, so memory stays flat on
+    large files.
+    """
 
     def open(self, path):
         self.file_handle = open(path, 'rb')
@@ -18,10 +23,37 @@ class PyPDF2(Pdf):
 
     @property
     def pages(self):
-        return (page for page in self.pdf.pages)
+        return self.get_pages(0, self.num_pages)
+
+    def get_pages(self, start, stop):
+        for nr in range(start, min(stop, self.num_pages)):
+            yield self.pdf.pages[nr]
+            # the next page is parsed from the file again, including shared
+            # objects such as fonts, which is cheaper than keeping them all
+            self.pdf.resolved_objects.clear()
+
+    @property
+    def metadata(self):
+        info = self.pdf.metadata
+        if info is None:
+            return iter([])
+        # indexing resolves indirect objects
+        return ((key.lstrip('/'), str(info[key])) for key in info if isinstance(info[key], str))
 
     def get_page_nr(self, page):
-        return list(self.pages).index(page)+1
+        # the reader maps page objects to numbers once per document
+        return self.pdf.get_page_number(page)+1
 
     def get_page_text(self, page):
         return page.extract_text().replace('\n', ' ')
+
+    def get_page_annots(self, page):
+        annots = page.get('/Annots')
+        if annots is None:
+            return []
+        contents = (annot.get_object().get('/Contents') for annot in annots.get_object())
+        return [str(c) for c in contents if c is not None]
+
+    def get_pages_content(self, start, stop):
+        for (nr, page) in enumerate(self.get_pages(start, stop), start + 1):
+            yield (nr, self.get_page_text(page), self.get_page_annots(page))
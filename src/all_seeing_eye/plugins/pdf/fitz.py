@@ -1,6 +1,23 @@
-import fitz
+try:
+    import pymupdf as fitz
+except ImportError:
+    # PyMuPDF before 1.24.3
+    import fitz  # type: ignore[no-redef]
 from all_seeing_eye.plugins.pdf.pdf import Pdf
 
+# the keys of the document information dictionary in doc.metadata
+METADATA = {
+    'title': 'Title',
+    'author': 'Author',
+    'subject': 'Subject',
+    'keywords': 'Keywords',
+    'creator': 'Creator',
+    'producer': 'Producer',
+    'creationDate': 'CreationDate',
+    'modDate': 'ModDate',
+    'trapped': 'Trapped',
+}
+
 
 class Fitz(Pdf):
 
@@ -18,10 +35,29 @@ class Fitz(Pdf):
 
     @property
     def pages(self):
-        return (page for page in self.doc)
+        return self.doc.pages()
+
+    def get_pages(self, start, stop):
+        return self.doc.pages(start, min(stop, len(self.doc)))
+
+    @property
+    def metadata(self):
+        metadata = self.doc.metadata or {}
+        return ((name, metadata[key]) for (key, name) in METADATA.items() if metadata.get(key))
 
     def get_page_nr(self, page):
         return page.number+1
 
     def get_page_text(self, page):
-        return page.get_text().replace('\n', ' ')
+        return page.get_text().replace('\n', ' ').strip()
+
+    def get_page_annots(self, page):
+        if page.first_annot is None:
+            return []
+        return [annot.info['content'] for annot in page.annots() if annot.info.get('content')]
+
+    def get_pages_content(self, start, stop):
+        # one call into MuPDF per page, the Page objects are not kept
+        for nr in range(start, min(stop, len(self.doc))):
+            page = self.doc.load_page(nr)
+            yield (nr + 1, self.get_page_text(page), self.get_page_annots(page))
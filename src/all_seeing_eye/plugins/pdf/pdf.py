@@ -1,5 +1,6 @@
 from abc import abstractmethod
-from typing import List, Generator, Dict, Any
+from itertools import islice
+from typing import List, Generator, Any, Iterator, Tuple
 from all_seeing_eye.plugins.plugins import Plugin
 
 
@@ -30,9 +31,15 @@ class Pdf(Plugin):
 
     @property
     @abstractmethod
-    def metadata(self) -> Dict[str, str]:
+    def metadata(self) -> Iterator[Tuple[str, str]]:
         pass
 
+    def get_pages(self, start: int, stop: int) -> Iterator[Any]:
+        """
+        Return the pages from start up to stop, counted from 0
+        """
+        return islice(self.pages, start, stop)
+
     @abstractmethod
     def get_page_nr(self, page) -> int:
         pass
@@ -44,3 +51,12 @@ class Pdf(Plugin):
     @abstractmethod
     def get_page_annots(self, page) -> List[str]:
         pass
+
+    def get_pages_content(self, start: int, stop: int) -> Iterator[Tuple[int, str, List[str]]]:
+        """
+        Return the number, the text and the annotations of the pages from
+        start up to stop, counted from 0. Plugins may override this to
+        extract many pages at once.
+        """
+        for page in self.get_pages(start, stop):
+            yield (self.get_page_nr(page), self.get_page_text(page), list(self.get_page_annots(page)))
@@ -19,9 +19,13 @@ class PdfPlumber(Pdf):
     def pages(self):
         return (page for page in self.handle.pages)
 
+    def get_pages(self, start, stop):
+        return iter(self.handle.pages[start:stop])
+
     @property
     def metadata(self):
-        return (item for item in self.handle.metadata.items())
+        # other values than text, e.g. /Pages 5, are not searched
+        return ((key, value) for (key, value) in self.handle.metadata.items() if isinstance(value, str))
 
     def get_page_nr(self, page):
         return page.page_number
@@ -1,7 +1,45 @@
+import threading
 from abc import ABC
 from importlib import import_module
 from dataclasses import dataclass, field
-from typing import Optional, Type
+from typing import Any, Dict, Optional, Tuple
+
+
+@dataclass
+class Registry:
+    """
+    The plugin classes resolved so far, the instances shared by all threads
+    and the entry points of the installed distributions, each looked up once
+    per process. Lookups of known entries do not take the lock.
+    """
+    classes: Dict[Tuple[type, str], type] = field(default_factory=dict)
+    shared: Dict[type, Any] = field(default_factory=dict)
+    groups: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # reentrant, loading an entry point may import modules resolving plugins
+    lock: Any = field(default_factory=threading.RLock, repr=False)
+
+
+registry = Registry()
+
+
+def entry_points(group: str) -> Dict[str, Any]:
+    """
+    Return the entry points of group by name, read from the metadata of the
+    installed distributions on the first call
+    """
+    if group not in registry.groups:
+        with registry.lock:
+            if group not in registry.groups:
+                registry.groups[group] = {}
+                try:
+                    from importlib import metadata
+                except ImportError:
+                    # Python < 3.8
+                    return registry.groups[group]
+                found: Any = metadata.entry_points()
+                selected = found.select(group=group) if hasattr(found, 'select') else found.get(group, [])
+                registry.groups[group] = {entry_point.name: entry_point for entry_point in selected}
+    return registry.groups[group]
 
 
 @dataclass
@@ -10,8 +48,6 @@ class Plugin(ABC):
     Interface for a PDF library
     """
     _module_name: Optional[str] = field(default=None)
-    _instance: Optional[Type['Plugin']] = field(default=None, init=False)
-    _class: Optional[Type['Plugin']] = field(default=None, init=False)
     _type: str = field(default='plugin', init=False)
 
     @classmethod
@@ -60,14 +96,75 @@ class Plugin(ABC):
             return arg
         raise Exception("All arguments are None")
 
+    @classmethod
+    def entry_point_group(cls) -> str:
+        """
+        Return the entry point group third-party plugins of this kind register
+        in, e.g. all_seeing_eye.matcher for a matcher
+        """
+        return f"all_seeing_eye.{cls.get_value(cls._module_name).split('.')[-2]}"
+
+    @classmethod
+    def entry_points(cls) -> Dict[str, Any]:
+        """
+        Return the entry points of plugins of this kind by name
+        """
+        return entry_points(cls.entry_point_group())
+
+    @classmethod
+    def resolve(cls, name: str):
+        """
+        Return the class registered as entry point name, or else the class in
+        the module name
+
+        :param      name:  The name of the entry point or the module
+        :type       name:  str
+
+        :returns:   The class.
+        :rtype:     Plugin
+
+        :raises     Exception:  If the class does not exist or does not
+                                subclass cls
+        """
+        entry_point = cls.entry_points().get(name)
+        if entry_point is None:
+            return cls.load_module(name, lambda subclass: name in str(subclass))
+        subclass = entry_point.load()
+        if not (isinstance(subclass, type) and issubclass(subclass, cls)):
+            raise Exception(f'{cls._type} entry point {name} does not subclass {cls.__name__}')
+        return subclass
+
     @classmethod
     def get_class(cls, module_name=None):
-        m = cls.get_value(module_name, cls._module_name)
-        return cls.load_module(m, lambda subclass: m in str(subclass))
+        """
+        Return the class given by an entry point or module name, the default
+        if None. It is resolved on the first call only.
+        """
+        key = (cls, cls.get_value(module_name, cls._module_name))
+        if key not in registry.classes:
+            with registry.lock:
+                if key not in registry.classes:
+                    registry.classes[key] = cls.resolve(key[1])
+        return registry.classes[key]
+
+    @classmethod
+    def create(cls, module_name=None, *args, **kwargs):
+        """
+        Return a new instance, owned by the caller. Plugins holding state of
+        their own, like an open PDF, are created per user.
+        """
+        return cls.get_class(module_name)(*args, **kwargs)
 
     @classmethod
     def get_instance(cls, module_name=None, *args, **kwargs):
-        if not cls._instance:
-            subclass = cls.load_module(module_name)
-            cls._instance = subclass(*args, **kwargs)
-        return cls._instance
+        """
+        Return the instance of the class shared by all threads, created on
+        the first call. Only for plugins that can be used by many threads at
+        once, like the matchers, tokenizers and segmentizers.
+        """
+        subclass = cls.get_class(module_name)
+        if subclass not in registry.shared:
+            with registry.lock:
+                if subclass not in registry.shared:
+                    registry.shared[subclass] = subclass(*args, **kwargs)
+        return registry.shared[subclass]
@@ -1,21 +1,90 @@
+import math
 import wordsegment
 from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
 from all_seeing_eye.plugins.segmentizer.segmentizer import Segmentizer
-import sys
 
 
 @dataclass
 class Wordsegment(Segmentizer):
-
+    """
+    Segmentation with the unigram and bigram model of wordsegment. The best
+    segmentation is built bottom-up instead of by wordsegment's recursive
+    search, with the same result but without a recursion limit. Segmenting
+    changes no state of the instance, many threads may share it.
+    """
     regex: str = field(default=r'|'.join([r"\/", r"\_", r"\-", r"\.", r"\:", r"\,", r"\;"]), repr=False)
+    chunk_size: int = field(default=250, repr=False)
 
     def __post_init__(self):
-        # wordsegment.segment needs this depth
-        sys.setrecursionlimit(2000)
-        wordsegment.load()  # type: ignore
+        self.segmenter = wordsegment.Segmenter()
+        self.segmenter.load()
 
     def segment(self, sentence):
-        try:
-            return " ".join(wordsegment.segment(sentence))  # type: ignore
-        except RecursionError:
-            return self.default_segment(sentence)
+        return " ".join(self.words(sentence))
+
+    def words(self, text: str) -> List[str]:
+        """
+        Return the words of text like wordsegment.segment(): the cleaned text
+        is segmented in chunks, every chunk continues with the last five
+        words of the previous one.
+        """
+        clean_text = self.segmenter.clean(text)
+        # only shared by the chunks of one text, such that it stays small
+        scores: Dict[str, float] = {}
+        words: List[str] = []
+        prefix = ''
+        for offset in range(0, len(clean_text), self.chunk_size):
+            chunk_words = self.search(prefix + clean_text[offset:offset+self.chunk_size], scores)
+            prefix = ''.join(chunk_words[-5:])
+            words += chunk_words[:-5]
+        return words + self.search(prefix, scores)
+
+    def search(self, text: str, scores: Dict[str, float]) -> List[str]:
+        """
+        Return the most probable division of text into words. best[i, previous]
+        is the score of the best division of text[i:] following the word
+        previous and the end of its first word, it is computed from the end
+        of the text towards its start. Bigrams only apply after known words,
+        the divisions after any other word are the same and kept once in
+        best[i, None].
+
+        Candidates of equal score are compared by their words like in
+        wordsegment, i.e. the longer first word wins. The unigram scores are
+        memoized in scores.
+        """
+        (n, limit, unigrams) = (len(text), self.segmenter.limit, self.segmenter.unigrams)
+        best: Dict[Tuple[int, Optional[str]], Tuple[float, int]] = {}
+
+        def rest(j: int, word: str) -> float:
+            return 0.0 if j == n else best[j, word if word in unigrams else None][0]
+
+        for i in range(n - 1, -1, -1):
+            ends = range(i + 1, min(n, i + limit) + 1)
+            best[i, None] = max((self.unigram_score(text[i:j], scores) + rest(j, text[i:j]), j) for j in ends)
+            previous_words = {'<s>'} if i == 0 else {text[k:i] for k in range(max(0, i - limit), i)}
+            for previous in previous_words & unigrams.keys():
+                best[i, previous] = max((self.log_score(text[i:j], previous, scores) + rest(j, text[i:j]), j) for j in ends)
+
+        words: List[str] = []
+        (i, previous) = (0, '<s>')
+        while i < n:
+            j = best[i, previous if previous in unigrams else None][1]
+            (i, previous) = (j, text[i:j])
+            words.append(previous)
+        return words
+
+    def unigram_score(self, word: str, scores: Dict[str, float]) -> float:
+        if word not in scores:
+            scores[word] = math.log10(self.segmenter.score(word))
+        return scores[word]
+
+    def log_score(self, word: str, previous: str, scores: Dict[str, float]) -> float:
+        """
+        math.log10(wordsegment's score(word, previous)) for a known previous
+        word
+        """
+        bigram = f'{previous} {word}'
+        if bigram in self.segmenter.bigrams:
+            return math.log10(self.segmenter.bigrams[bigram] / self.segmenter.total / self.segmenter.score(previous))
+        return self.unigram_score(word, scores)
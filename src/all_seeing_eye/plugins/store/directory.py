@@ -0,0 +1,58 @@
+import os
+import shutil
+from typing import Optional, Set
+from all_seeing_eye.lib.columns import Columns
+from all_seeing_eye.plugins.store.store import Store
+
+
+class Directory(Store):
+    """
+    Stores every chunk in a file cache_dir/name/key/chunk.cache. Chunks are
+    written next to their final name and renamed into place, which is atomic
+    on POSIX file systems. Directories are created when a document is first
+    written, reading never creates anything.
+    """
+
+    def open(self, cache_dir, name):
+        self.root = os.path.join(cache_dir, name)
+
+    def close(self):
+        pass
+
+    def fname(self, key: str, name: str) -> str:
+        return os.path.join(self.root, key, f'{name}.cache')
+
+    def names(self, key):
+        try:
+            return {name[:-len('.cache')] for name in os.listdir(os.path.join(self.root, key)) if name.endswith('.cache')}
+        except FileNotFoundError:
+            return set()
+
+    def load(self, key, name, path) -> Optional[Columns]:
+        try:
+            # the cache is keyed on contents, the file may have been moved
+            return Columns(self.fname(key, name), path)
+        except (FileNotFoundError, ValueError):
+            # removed meanwhile or written in an older format
+            return None
+
+    def save(self, key, name, fname):
+        os.replace(fname, self.fname(key, name))
+
+    def temp_dir(self, key):
+        directory = os.path.join(self.root, key)
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def collect_garbage(self, live: Set[str]):
+        if not os.path.isdir(self.root):
+            return
+        for name in os.listdir(self.root):
+            entry = os.path.join(self.root, name)
+            if name.split('-')[0] not in live:
+                if os.path.isdir(entry):
+                    shutil.rmtree(entry)
+                else:
+                    os.remove(entry)
+            elif os.path.isdir(entry):
+                self.remove_stale(entry)
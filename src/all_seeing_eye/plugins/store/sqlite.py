@@ -0,0 +1,62 @@
+import os
+import sqlite3
+import threading
+from typing import Optional, Set
+from all_seeing_eye.lib.columns import Columns
+from all_seeing_eye.plugins.store.store import Store
+
+
+class Sqlite(Store):
+    """
+    Stores all chunks in one SQLite database cache_dir/name.sqlite in WAL
+    mode, where readers never wait for writers and every chunk is saved in
+    a transaction of its own. Many runs can share it without creating a file
+    per chunk. A chunk is read into memory as a whole, its size is bounded
+    by --chunk-pages.
+    """
+
+    def open(self, cache_dir, name):
+        self.tmp = os.path.join(cache_dir, f'{name}.tmp')
+        os.makedirs(self.tmp, exist_ok=True)
+        self.db_name = os.path.join(cache_dir, f'{name}.sqlite')
+        # the pipeline shares the store of a config among its threads
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.db_name, timeout=60, isolation_level=None, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS chunks (key TEXT, name TEXT, data BLOB, PRIMARY KEY (key, name))')
+
+    def close(self):
+        self.db.close()
+
+    def names(self, key):
+        with self.lock:
+            return {name for (name,) in self.db.execute('SELECT name FROM chunks WHERE key = ?', (key,))}
+
+    def load(self, key, name, path) -> Optional[Columns]:
+        with self.lock:
+            row = self.db.execute('SELECT data FROM chunks WHERE key = ? AND name = ?', (key, name)).fetchone()
+        if row is None:
+            return None
+        try:
+            return Columns(f'{self.db_name}:{key}/{name}', path, data=row[0])
+        except ValueError:
+            return None
+
+    def save(self, key, name, fname):
+        with open(fname, 'rb') as handle:
+            data = handle.read()
+        with self.lock:
+            self.db.execute('INSERT OR REPLACE INTO chunks VALUES (?, ?, ?)', (key, name, data))
+        os.remove(fname)
+
+    def temp_dir(self, key):
+        return self.tmp
+
+    def collect_garbage(self, live: Set[str]):
+        with self.lock:
+            keys = [key for (key,) in self.db.execute('SELECT DISTINCT key FROM chunks')]
+            with self.db:
+                self.db.execute('BEGIN')
+                self.db.executemany('DELETE FROM chunks WHERE key = ?', [(key,) for key in keys if key.split('-')[0] not in live])
+        self.remove_stale(self.tmp)
@@ -0,0 +1,107 @@
+import os
+import time
+import threading
+from abc import abstractmethod
+from typing import Optional, Set, TYPE_CHECKING
+from all_seeing_eye.plugins.plugins import Plugin
+
+# lib.columns needs lib.app, which imports this module
+if TYPE_CHECKING:
+    from all_seeing_eye.lib.columns import Columns
+
+
+class Store(Plugin):
+    """
+    Interface for a cache store of columnar chunk files. The chunks of a
+    document are stored under its key, every chunk under its name. A chunk is
+    written to a temporary file first and only becomes visible when it is
+    saved as a whole, such that concurrent runs sharing a store never read a
+    partial chunk.
+    """
+    _module_name = 'all_seeing_eye.plugins.store.directory'
+    _type = 'Store'
+
+    @abstractmethod
+    def open(self, cache_dir: str, name: str):
+        """
+        Open the store name in cache_dir, creating it if needed
+
+        :param      cache_dir:  The cache directory
+        :type       cache_dir:  str
+        :param      name:       The name of the store
+        :type       name:       str
+        """
+        pass
+
+    @abstractmethod
+    def close(self):
+        pass
+
+    @abstractmethod
+    def names(self, key: str) -> Set[str]:
+        """
+        Return the names of the chunks stored under a key
+        """
+        pass
+
+    @abstractmethod
+    def load(self, key: str, name: str, path: str) -> Optional['Columns']:
+        """
+        Return a reader of a chunk, None if the chunk is missing or written
+        in an older format
+
+        :param      key:   The key of the document
+        :type       key:   str
+        :param      name:  The name of the chunk
+        :type       name:  str
+        :param      path:  The path of the items
+        :type       path:  str
+
+        :returns:   The reader, to be closed by the caller
+        :rtype:     Optional[Columns]
+        """
+        pass
+
+    @abstractmethod
+    def save(self, key: str, name: str, fname: str):
+        """
+        Store the complete chunk file fname, written to temp_name(key, name),
+        atomically. The store takes over the file.
+        """
+        pass
+
+    @abstractmethod
+    def collect_garbage(self, live: Set[str]):
+        """
+        Remove the chunks of the documents whose digest is not live, and the
+        temporary files of runs that were killed
+
+        :param      live:  The digests of the files that still exist
+        :type       live:  Set[str]
+        """
+        pass
+
+    @abstractmethod
+    def temp_dir(self, key: str) -> str:
+        pass
+
+    def temp_name(self, key: str, name: str) -> str:
+        """
+        Return a file name to write a chunk to, unique to this process and
+        thread
+        """
+        return os.path.join(self.temp_dir(key), f'{name}.{os.getpid()}-{threading.get_ident()}.tmp')
+
+    @staticmethod
+    def remove_stale(directory: str, max_age: float = 3600):
+        """
+        Remove the temporary files in directory older than max_age seconds,
+        younger ones may belong to a run that is still writing them
+        """
+        for name in os.listdir(directory):
+            fname = os.path.join(directory, name)
+            try:
+                if name.endswith('.tmp') and os.stat(fname).st_mtime < time.time() - max_age:
+                    os.remove(fname)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,79 @@
+import re
+from typing import List
+from all_seeing_eye.plugins.tokenizer.tokenizer import Tokenizer
+
+OPENING = '\'"([‘‚“„«'
+# sentence ending punctuation, closing quotes or brackets and a space, the
+# next word is looked ahead at behind opening quotes or brackets
+CANDIDATE = re.compile(r'[.!?…]+[\'"‘’“”»)\]]*\s+(?=[' + re.escape(OPENING) + r']*(\w*))')
+# e.g, i.e, z.B, u.a, U.S
+ACRONYM = re.compile(r'(?:[^\W\d_]{1,3}\.)+[^\W\d_]{1,3}')
+NUMBER = re.compile(r'\d[\d.,]*')
+
+# words of English and German texts followed by a period that does not end
+# the sentence, in lower case
+ABBREVIATIONS = frozenset('''
+    al approx ca cf co corp dept dr esp etc inc jr ltd mr mrs ms prof resp sr st vs
+    abs bd bspw bzgl bzw evtl ff fr ggf hr inkl jh jhd mio mrd sog str usw vgl zzgl
+'''.split())
+# abbreviations that are units after a number: "Ms. Smith", but "took 5 ms."
+UNITS = frozenset(['ms'])
+# abbreviations only before a number, "no" also ends sentences, and so do
+# "min" and "max" as units: "max. 5 items", but "took 5 min."
+NUMBERED = frozenset('abb art eq eqs fig figs kap max min no nos nr p pp s sec tab vol'.split())
+# ordinals are followed by a period in German dates: "am 3. Oktober"
+MONTHS = frozenset('''
+    january february march april may june july august september october november december
+    januar februar märz april mai juni juli august september oktober november dezember
+'''.split())
+
+
+class Regex(Tokenizer):
+    """
+    Splits English and German texts into sentences with compiled regular
+    expressions and rules instead of a trained model, like Punkt nothing is
+    loaded. A sentence ends at ".", "!", "?" or "…" followed by a space,
+    unless the next word starts in lower case, or a period follows an
+    abbreviation, an initial or the day of a date.
+    """
+
+    def tokenize(self, word):
+        sentences: List[str] = []
+        start = 0
+        for match in CANDIDATE.finditer(word):
+            if match.end() < len(word) and self.ends_sentence(word, match):
+                sentences.append(word[start:match.end()].strip())
+                start = match.end()
+        rest = word[start:].strip()
+        return sentences + [rest] if rest else sentences
+
+    @staticmethod
+    def ends_sentence(text: str, match: 're.Match[str]') -> bool:
+        """
+        Return whether the punctuation matched by CANDIDATE ends a sentence
+
+        :param      text:   The text
+        :type       text:   str
+        :param      match:  The match of CANDIDATE in text
+        :type       match:  re.Match[str]
+
+        :returns:   True if a sentence ends
+        :rtype:     bool
+        """
+        following = match.group(1)
+        if following[:1].islower():
+            return False
+        if text[match.start()] != '.' or text.startswith('..', match.start()):
+            return True
+        before = text[max(0, match.start() - 32):match.start()].rsplit(None, 2)
+        previous = before[-1].lstrip(OPENING).lower() if before else ''
+        if previous in UNITS and len(before) > 1 and NUMBER.fullmatch(before[-2]):
+            return True
+        if previous in ABBREVIATIONS or ACRONYM.fullmatch(previous):
+            return False
+        if len(previous) == 1 and previous.isalpha():
+            # an initial
+            return False
+        if previous in NUMBERED and following[:1].isdigit():
+            return False
+        return not (previous.isdigit() and len(previous) <= 2 and following.lower() in MONTHS)
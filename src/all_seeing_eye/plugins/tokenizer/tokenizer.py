@@ -1,5 +1,5 @@
 from abc import abstractmethod
-from typing import List
+from typing import Iterable, List
 from all_seeing_eye.plugins.plugins import Plugin
 
 
@@ -7,9 +7,22 @@ class Tokenizer(Plugin):
     """
     Interface for a Token library
     """
-    _module_name = 'all_seeing_eye.plugins.tokenizer.tokenize'
+    _module_name = 'all_seeing_eye.plugins.tokenizer.regex'
     _type = 'Token'
 
     @abstractmethod
     def tokenize(self, word: str) -> List[str]:
         pass
+
+    def tokenize_many(self, pages: Iterable[str]) -> List[List[str]]:
+        """
+        Return the sentences of many texts, such that tokenizers can prepare
+        their work once for all of them
+
+        :param      pages:  The texts, e.g. of the pages of a document
+        :type       pages:  Iterable[str]
+
+        :returns:   The sentences of every text
+        :rtype:     List[List[str]]
+        """
+        return [self.tokenize(page) for page in pages]
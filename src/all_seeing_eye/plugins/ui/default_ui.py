@@ -19,8 +19,5 @@ class Default(Ui):
     def __exit__(self, type, value, traceback):
         pass
 
-    def show_results(self):
-        print(self.app.matches)
-
-    def new_match(self, match):
-        print(match)
+    def write(self, text):
+        tqdm.write(text)
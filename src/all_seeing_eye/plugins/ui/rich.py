@@ -24,8 +24,5 @@ class Rich(Ui):
     def __exit__(self, exc_type, exc_value, exc_traceback):
         pass
 
-    def show_results(self):
-        print(self.app.matches)
-
-    def new_match(self, match):
-        print(match)
+    def write(self, text):
+        print(text)
@@ -1,6 +1,6 @@
 from abc import abstractmethod
 from dataclasses import field
-from typing import Iterator, Type, Any, Optional
+from typing import Iterator, Any
 from all_seeing_eye.plugins.plugins import Plugin
 
 
@@ -8,7 +8,7 @@ class Ui(Plugin):
     """
     Interface for a Token library
     """
-    app: Optional[Type[Any]] = field(default=None, init=False)
+    app: Any = field(default=None, init=False)
     _module_name = 'all_seeing_eye.plugins.ui.default_ui'
     _type = 'UI'
 
@@ -25,9 +25,19 @@ class Ui(Plugin):
         pass
 
     @abstractmethod
-    def show_results(self):
+    def write(self, text: str) -> None:
         pass
 
-    @abstractmethod
+    def show_results(self):
+        """
+        Show the files ranked by their matches with --top, else the matches
+        """
+        ranking = self.app.ranking()
+        if ranking is None:
+            self.write(str(self.app.matches))
+            return
+        for line in ranking.lines(self.app.args.top):
+            self.write(line)
+
     def new_match(self, match) -> None:
-        pass
+        self.write(str(match))
@@ -0,0 +1,18 @@
+import pytest
+from pdfs import make_pdf
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    """
+    A directory with a few small PDF files
+    """
+    directory = tmp_path / 'corpus'
+    directory.mkdir()
+    for i in range(4):
+        make_pdf(str(directory / f'doc{i}.pdf'),
+                 pages=[[f"Lorem ipsum dolor sit amet {i}. The all seeing eye searches PDF files."],
+                        [f"Page two of document {i}. Nothing to see here."]],
+                 annots=[[f"Remark number {i}"], []],
+                 metadata={'Author': f'Author {i}', 'Title': f'Document {i}'})
+    return directory
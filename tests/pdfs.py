@@ -0,0 +1,53 @@
+"""
+Minimal PDF files for the tests and the benchmarks
+"""
+
+
+def make_pdf(path, pages, annots=None, metadata=None):
+    """
+    Write a minimal PDF file with one text line per entry of pages
+
+    :param      path:      The path of the file to write
+    :type       path:      str
+    :param      pages:     The text lines of every page
+    :type       pages:     List[List[str]]
+    :param      annots:    The annotation texts of every page
+    :type       annots:    List[List[str]]
+    :param      metadata:  The document information dictionary, other values
+                           than strings are written as they are
+    :type       metadata:  Dict[str, Any]
+    """
+    annots = annots or [[] for _ in pages]
+    objects = {}
+    page_ids = []
+    next_id = 5
+    for lines, page_annots in zip(pages, annots):
+        page_id, content_id = next_id, next_id + 1
+        annot_ids = list(range(next_id + 2, next_id + 2 + len(page_annots)))
+        next_id = next_id + 2 + len(page_annots)
+        stream = ("BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({line}) '" for line in lines) + " ET").encode()
+        objects[page_id] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R "
+                            f"/Annots [{' '.join(f'{i} 0 R' for i in annot_ids)}] >>").encode()
+        objects[content_id] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        for annot_id, annot in zip(annot_ids, page_annots):
+            objects[annot_id] = f"<< /Type /Annot /Subtype /Text /Rect [100 100 120 120] /Contents ({annot}) >>".encode()
+        page_ids.append(page_id)
+
+    objects[1] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>".encode()
+    objects[3] = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    objects[4] = ("<< " + " ".join(f"/{k} ({v})" if isinstance(v, str) else f"/{k} {v}" for k, v in (metadata or {}).items()) + " >>").encode()
+
+    body = b"%PDF-1.4\n"
+    offsets = {}
+    for obj_id in sorted(objects):
+        offsets[obj_id] = len(body)
+        body += b"%d 0 obj\n%s\nendobj\n" % (obj_id, objects[obj_id])
+    xref = len(body)
+    body += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    body += b"".join(b"%010d 00000 n \n" % offsets[i] for i in sorted(objects))
+    body += b"trailer\n<< /Size %d /Root 1 0 R /Info 4 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, 'wb') as handle:
+        handle.write(body)
+    return path
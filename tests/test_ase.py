@@ -0,0 +1,295 @@
+from multiprocessing import Pool
+from functools import partial
+import os
+import shutil
+import socket
+import threading
+import time
+import pytest
+from tqdm import tqdm
+from all_seeing_eye.ase import search, search_queries, read_queries, search_parallel, PdfSegments, init_worker, search_worker, PdfDocument, parser, main, \
+    answer_query, serve_parser
+from all_seeing_eye.lib.app import App, SearchConfig, Match, Item
+from all_seeing_eye.lib.digests import FileDigests
+from all_seeing_eye import ase
+from all_seeing_eye.lib import server
+from pdfs import make_pdf
+
+
+def test_search(corpus, tmp_path):
+    config = SearchConfig(directories=[str(corpus)], contents=True, cache_dir=str(tmp_path / 'cache'))
+    matches = search(config.files[0], config, "seeing eye", 90)
+    assert [m.item.where for m in matches] == ["Contents of page 1/2"]
+
+
+@pytest.mark.parametrize('chunk_pages', [1, 64])
+def test_search_parallel(corpus, tmp_path, chunk_pages):
+    config = SearchConfig(directories=[str(corpus)], contents=True, cache_dir=str(tmp_path / 'cache'), jobs=2,
+                          chunk_pages=chunk_pages)
+    expected = [search(path, config, "Page two", 50) for path in config.files]
+    assert any(len(matches) > 1 for matches in expected)
+    with Pool(config.jobs, initializer=init_worker, initargs=(config.settings(), "Page two", 50, False)) as pool:
+        assert list(search_parallel(pool, config.files, False)) == expected
+    init_worker(config.settings(), "Page two", 50, False)
+    assert search_worker((config.files[0], 0, None))[1] == ([(1, 2)] if chunk_pages == 1 else [])
+
+
+class SyncPool:
+    """
+    Runs the units when they are submitted and records them
+    """
+    def __init__(self):
+        self.units = []
+
+    def apply_async(self, func, args, callback=None):
+        self.units.append(args[0])
+        result = func(*args)
+        if callback is not None:
+            callback(result)
+        return type('Result', (), {'get': lambda _: result})()
+
+
+def test_search_parallel_window(corpus, tmp_path):
+    config = SearchConfig(directories=[str(corpus)], contents=True, cache_dir=str(tmp_path / 'cache'), chunk_pages=1)
+    files = config.files * 3
+    init_worker(config.settings(), "Page two", 50, False)
+    pool = SyncPool()
+    results = search_parallel(pool, files, False, window=2)
+    first = next(results)
+    assert first == search(files[0], config, "Page two", 50)
+    # the rest of a file is submitted with its first unit, only two files ahead
+    assert [path for (path, _, _) in pool.units] == [files[0], files[0], files[1], files[1], files[2], files[2]]
+    assert [first] + list(results) == [search(path, config, "Page two", 50) for path in files]
+
+
+def test_chunks_resume(corpus, tmp_path):
+    config = SearchConfig(directories=[str(corpus)], contents=True, cache_dir=str(tmp_path / 'cache'), chunk_pages=1)
+    segments = iter(PdfSegments(config.files[0], config))
+    items = [next(segments) for _ in range(9)]
+    assert items[-1].where == 'Contents of page 2/2'
+    # the run is killed
+    with pytest.raises(KeyboardInterrupt):
+        segments.throw(KeyboardInterrupt)
+    chunk_dir, = (tmp_path / 'cache' / 'PdfDocument').iterdir()
+    assert sorted(os.listdir(chunk_dir)) == ['0-1.cache', 'meta-2.cache']
+
+    expected = list(PdfSegments(config.files[0], config))
+    assert sorted(os.listdir(chunk_dir)) == ['0-1.cache', '1-2.cache', 'meta-2.cache']
+    assert list(PdfSegments(config.files[0], config)) == expected
+
+
+def test_cache_follows_contents(corpus, tmp_path):
+    config = SearchConfig(directories=[str(corpus)], contents=True, cache_dir=str(tmp_path / 'cache'))
+    before = search(config.files[0], config, "seeing eye", 90)
+    moved = str(corpus / 'moved.pdf')
+    os.rename(config.files[0], moved)
+    after = search(moved, config, "seeing eye", 90)
+    assert [m.item.path for m in after] == [moved]
+    assert [m.item.where for m in after] == [m.item.where for m in before]
+    assert len(os.listdir(tmp_path / 'cache' / 'FileDigests')) == 2
+
+    os.remove(moved)
+    PdfDocument.collect_garbage(config)
+    assert os.listdir(tmp_path / 'cache' / 'FileDigests') == []
+    assert os.listdir(tmp_path / 'cache' / 'PdfDocument') == []
+
+
+def test_digests_garbage(corpus, tmp_path):
+    digests = FileDigests(str(tmp_path / 'cache'))
+    live = {digests.digest(path) for path in sorted(map(str, corpus.iterdir()))}
+    directory = tmp_path / 'cache' / 'FileDigests'
+    (directory / 'broken.cache').write_bytes(b'not a pickle')
+    (directory / 'old.cache.1-2.tmp').write_bytes(b'')
+    os.utime(directory / 'old.cache.1-2.tmp', (0, 0))
+    (directory / 'new.cache.1-2.tmp').write_bytes(b'')
+    assert digests.collect_garbage() == live
+    assert sorted(os.listdir(directory)) == sorted([os.path.basename(digests.entry_fname(str(path))) for path in corpus.iterdir()]
+                                                   + ['new.cache.1-2.tmp'])
+
+
+def test_single_pass(corpus, tmp_path, monkeypatch):
+    config = SearchConfig(directories=[str(corpus)], contents=True, cache_dir=str(tmp_path / 'cache'))
+    opened = []
+    monkeypatch.setattr(config.pdf, 'open', lambda path, open=config.pdf.open: opened.append(path) or open(path))
+    items = list(PdfSegments(config.files[0], config))
+    assert opened == [config.files[0]]
+    assert [i.where for i in items if i.where.startswith(('Metadata', 'Annotations'))] == \
+        ['Metadata', 'Metadata', 'Annotations of page 1/2']
+    assert list(PdfSegments(config.files[0], config)) == items
+    assert opened == [config.files[0]]
+
+
+def test_search_break(corpus, tmp_path):
+    config = SearchConfig(directories=[str(corpus)], contents=True, cache_dir=str(tmp_path / 'cache'))
+    assert len(search(config.files[0], config, "document", 70, brk=True)) == 1
+    chunk_dir, = (tmp_path / 'cache' / 'PdfDocument').iterdir()
+    # the chunk the search stopped in is cached all the same
+    assert sorted(os.listdir(chunk_dir)) == ['0-2.cache', 'meta-2.cache']
+    plain = SearchConfig(directories=[str(corpus)], contents=True, cache_dir=None)
+    assert list(PdfSegments(config.files[0], config)) == list(PdfSegments(config.files[0], plain))
+    assert len(search(config.files[0], config, "document", 70)) > 1
+
+
+@pytest.mark.parametrize('brk', [False, True])
+def test_search_queries(corpus, tmp_path, brk):
+    config = SearchConfig(directories=[str(corpus)], contents=True, cache_dir=str(tmp_path / 'cache'))
+    (tmp_path / 'queries.txt').write_text("# saved queries\nseeing eye\t90\n\nPage two\t50\ndocument\n")
+    queries = read_queries(str(tmp_path / 'queries.txt'), 70)
+    assert queries == [("seeing eye", 90), ("Page two", 50), ("document", 70)]
+    for path in config.files:
+        assert search_queries(path, config, queries, brk) == [search(path, config, query, threshold, brk)
+                                                              for (query, threshold) in queries]
+
+
+def test_read_queries_error(tmp_path, capsys):
+    path = tmp_path / 'queries.txt'
+    path.write_text("seeing eye\t90\n\nPage two\tfifty\n")
+    with pytest.raises(ValueError, match=f'{path}:3: invalid literal'):
+        read_queries(str(path), 70)
+    path.write_text("seeing eye\n?!\n")
+    with pytest.raises(SystemExit):
+        main(['batch', str(path), '--config', str(tmp_path / 'config.json')])
+    assert f'{path}:2: ' in capsys.readouterr().err
+
+
+def test_batch(corpus, tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setattr(tqdm, 'monitor_interval', 0)
+    (tmp_path / 'queries.txt').write_text("seeing eye\t90\nPage two\t50\n")
+    argv = ['batch', str(tmp_path / 'queries.txt'), '-c', '-d', str(corpus), '--config', str(tmp_path / 'config.json')]
+    main(argv + ['--json'])
+    expected = capsys.readouterr().out
+    assert '"Contents of page 1/2"' in expected
+    main(argv + ['--json', '-j', '2'])
+    assert capsys.readouterr().out == expected
+    main(argv)
+    report = capsys.readouterr().out.splitlines()
+    assert report[0] == "'seeing eye' (threshold 90):" and report[1].startswith('[Match(score=')
+
+
+def test_limit(corpus, tmp_path):
+    app = App(parser().parse_args(['query', '-l', '2', '-d', str(corpus), '--config', str(tmp_path / 'config.json')]))
+    app.add_matches(Match(score, Item('/doc.pdf', str(i), {})) for i, score in enumerate([80, 90, 85, 100, 90]))
+    assert not app.done
+    app.finish()
+    assert [(m.score, m.item.where) for m in app.matches] == [(100, '3'), (90, '1')]
+    app.add_matches([Match(100, Item('/doc.pdf', '5', {}))])
+    assert app.done
+
+
+@pytest.mark.parametrize('limit', ['0', '-1', 'x'])
+def test_limit_invalid(limit, capsys):
+    with pytest.raises(SystemExit):
+        parser().parse_args(['query', '-l', limit])
+    assert 'argument -l/--limit' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('option', ['-j', '--chunk-pages'])
+def test_positive_options(option, capsys):
+    assert parser().parse_args(['query', option, '2'])
+    with pytest.raises(SystemExit):
+        parser().parse_args(['query', option, '0'])
+    assert 'is not a positive integer' in capsys.readouterr().err
+
+
+def test_top(corpus, tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    # no monitor thread outliving the test
+    monkeypatch.setattr(tqdm, 'monitor_interval', 0)
+    main(['seeing eye', '-c', '--top', '1', '-l', '5', '-d', str(corpus), '--config', str(tmp_path / 'config.json')])
+    (config, *report) = capsys.readouterr().out.splitlines()
+    # no line per match before the ranking
+    assert config.startswith('app.config = ')
+    assert len(report) == 2 and report[0].startswith(f'1. {corpus}')
+    assert report[1].startswith('   Contents of page 1/2 (') and '*seeing* *eye*' in report[1]
+
+
+def test_answer_query(corpus, tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    app = App(serve_parser().parse_args(['-d', str(corpus), '--config', str(tmp_path / 'config.json')]))
+    warm = {}
+    request = {'query': 'seeing eye', 'threshold': 90, 'limit': None, 'brk': False}
+    # the daemon does not search the contents, the query does
+    assert answer_query(app, None, warm, request) == {'matches': []}
+    response = answer_query(app, None, warm, {**request, 'settings': {'contents': True}})
+    assert {m['item']['where'] for m in response['matches']} == {'Contents of page 1/2'}
+    assert len(warm) == 2
+    assert answer_query(app, None, warm, {**request, 'index': True}) == {'refused': 'the daemon has no index'}
+
+    # the files and their items are kept in memory
+    monkeypatch.setattr(SearchConfig, 'find_files', None)
+    monkeypatch.setattr(ase, 'PdfSegments', None)
+    assert answer_query(app, None, warm, {**request, 'settings': {'contents': True}}) == response
+    monkeypatch.undo()
+
+    # and updated by the watcher
+    shutil.copy(corpus / 'doc0.pdf', corpus / 'copy.pdf')
+    os.remove(corpus / 'doc1.pdf')
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        paths = {m['item']['path'] for m in answer_query(app, None, warm, {**request, 'settings': {'contents': True}})['matches']}
+        if paths == {str(corpus / name) for name in ('copy.pdf', 'doc0.pdf', 'doc2.pdf', 'doc3.pdf')}:
+            break
+        time.sleep(0.1)
+    else:
+        pytest.fail(f'not updated: {paths}')
+
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='needs Unix sockets')
+def test_query(corpus, tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setattr(tqdm, 'monitor_interval', 0)
+    path = str(tmp_path / 'ase.sock')
+    app = App(serve_parser().parse_args(['-d', str(corpus), '--config', str(tmp_path / 'config.json')]))
+    threading.Thread(target=server.serve, args=(path, partial(answer_query, app, None, {})), daemon=True).start()
+    while not server.is_running(path):
+        time.sleep(0.01)
+
+    find_files = SearchConfig.find_files
+
+    def daemon_only(config):
+        # the client does not walk the directories
+        assert not config.directories or threading.current_thread() is not threading.main_thread()
+        return find_files(config)
+    monkeypatch.setattr(SearchConfig, 'find_files', daemon_only)
+    main(['query', 'seeing eye', '-c', '--top', '1', '-d', str(corpus), '--config', str(tmp_path / 'config.json'),
+          '--socket', path])
+    report = capsys.readouterr().out.splitlines()
+    # answered by the daemon, which does not print the config
+    assert len(report) == 2 and report[0].startswith(f'1. {corpus}')
+    assert '*seeing* *eye*' in report[1]
+    monkeypatch.setattr(SearchConfig, 'find_files', find_files)
+
+    main(['query', 'seeing eye', '-i', '-d', str(corpus), '--config', str(tmp_path / 'config.json'), '--socket', path])
+    captured = capsys.readouterr()
+    assert 'the daemon has no index' in captured.err and captured.out.startswith('app.config = ')
+
+
+@pytest.mark.parametrize('backend', ['all_seeing_eye.plugins.pdf.fitz', 'all_seeing_eye.plugins.pdf.PyPDF2'])
+def test_pdf_backend(corpus, tmp_path, backend):
+    config = SearchConfig(directories=[str(corpus)], contents=True, cache_dir=None)
+    other = SearchConfig(directories=[str(corpus)], contents=True, cache_dir=None, pdf_module=backend)
+    assert other.extraction_hash != config.extraction_hash
+    for path in config.files:
+        expected = sorted((i.where, i.term['search'].strip()) for i in PdfSegments(path, config))
+        assert sorted((i.where, i.term['search'].strip()) for i in PdfSegments(path, other)) == expected
+
+
+@pytest.mark.parametrize('backend', ['all_seeing_eye.plugins.pdf.pdfplumber', 'all_seeing_eye.plugins.pdf.fitz',
+                                     'all_seeing_eye.plugins.pdf.PyPDF2'])
+def test_pdf_metadata(tmp_path, backend):
+    path = make_pdf(str(tmp_path / 'numbers.pdf'), [["All-seeing eye"]], metadata={'Title': 'Seeing eye', 'Pages': 5})
+    config = SearchConfig(directories=[str(tmp_path)], contents=False, cache_dir=None, pdf_module=backend)
+    assert [i.term['search'].strip() for i in PdfSegments(path, config) if i.where == 'Metadata'] == ['seeing eye']
+
+
+@pytest.mark.parametrize('method', ['open', 'get_pages_content'])
+def test_pdf_fallback(corpus, tmp_path, monkeypatch, method):
+    config = SearchConfig(directories=[str(corpus)], contents=True, cache_dir=str(tmp_path / 'cache'),
+                          pdf_module='all_seeing_eye.plugins.pdf.fitz')
+
+    def broken(*args):
+        raise RuntimeError('cannot read')
+    monkeypatch.setattr(config.pdf, method, broken)
+    matches = search(config.files[0], config, "seeing eye", 90)
+    assert [m.item.where for m in matches] == ["Contents of page 1/2"]
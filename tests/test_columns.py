@@ -0,0 +1,72 @@
+import os
+import tracemalloc
+import pytest
+from all_seeing_eye.lib.app import Item
+from all_seeing_eye.lib.columns import Columns, ColumnsWriter
+
+items = [
+    Item('/doc.pdf', 'Contents of page 1/2', {'display': 'Lorem ipsum', 'search': 'Lorem ipsum'}),
+    Item('/doc.pdf', 'Contents of page 1/2', {'display': 'Grüße aus Zürich', 'search': 'Grüße aus Zürich'}),
+    Item('/doc.pdf', 'Contents of page 2/2', {'display': 'dolor-sit', 'search': 'dolor sit'}),
+    Item('/doc.pdf', 'Annotations of page 2/2', {'display': '', 'search': ''}),
+]
+
+
+def test_roundtrip(tmp_path):
+    fname = str(tmp_path / 'doc.cache')
+    Columns.dump(items, fname)
+    columns = Columns(fname, '/moved.pdf')
+    assert len(columns) == len(items)
+    assert columns.locations == ['Contents of page 1/2', 'Contents of page 2/2', 'Annotations of page 2/2']
+    assert list(columns) == [Item('/moved.pdf', i.where, i.term) for i in items]
+    assert columns[2].term == {'display': 'dolor-sit', 'search': 'dolor sit'}
+    # only search texts that are not the display text are stored
+    assert bytes(columns.sections['search']) == b'dolor sit'
+    columns.close()
+
+
+def test_empty(tmp_path):
+    fname = str(tmp_path / 'empty.cache')
+    Columns.dump([], fname)
+    assert list(Columns(fname, '/doc.pdf')) == []
+
+
+def test_invalid(tmp_path):
+    fname = tmp_path / 'old.cache'
+    fname.write_bytes(b'\x80\x05\x95 not a columnar file at all')
+    with pytest.raises(ValueError):
+        Columns(str(fname), '/doc.pdf')
+
+
+def many(n):
+    for i in range(n):
+        yield Item('/doc.pdf', f'Contents of page {i // 100 + 1}', {'display': f'Sentence {i}', 'search': f'sentence {i}'})
+
+
+@pytest.mark.parametrize('n', [1, 4096, 10000])
+def test_writer_blocks(tmp_path, n):
+    fname = str(tmp_path / 'doc.cache')
+    with ColumnsWriter(fname, block=4096, spool=1024) as writer:
+        for item in many(n):
+            writer.append(item)
+    assert list(Columns(fname, '/doc.pdf')) == list(many(n))
+
+
+def test_writer_memory(tmp_path):
+    peaks = []
+    for n in (2000, 20000):
+        tracemalloc.start()
+        with ColumnsWriter(str(tmp_path / 'doc.cache'), block=256, spool=4096) as writer:
+            for item in many(n):
+                writer.append(item)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    assert peaks[1] < 2 * peaks[0]
+
+
+def test_writer_discard(tmp_path):
+    with pytest.raises(KeyError):
+        with ColumnsWriter(str(tmp_path / 'doc.cache')) as writer:
+            writer.append(items[0])
+            raise KeyError()
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,109 @@
+import random
+import pytest
+from all_seeing_eye.ase import index_changes
+from all_seeing_eye.lib.app import Item, SearchConfig
+from all_seeing_eye.lib.index import Index, ngrams
+from all_seeing_eye.lib.normalize import normalize
+from all_seeing_eye.plugins.matcher.matcher import Matcher
+
+matcher_modules = [
+    'all_seeing_eye.plugins.matcher.fuzzywuzzy',
+    'all_seeing_eye.plugins.matcher.rapidfuzz',
+    'all_seeing_eye.plugins.matcher.default_matcher',
+]
+
+terms = [
+    "Lorem ipsum dolor sit amet, consetetur sadipscing elitr",
+    "sed diam nonumy eirmod tempor invidunt ut labore",
+    "et dolore magna aliquyam erat, sed diam voluptua",
+    "The all-seeing eye searches PDF files",
+    "Author: Roman",
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    with Index(str(tmp_path / 'index.sqlite'), batch_size=2) as index:
+        index.add(Item('/doc.pdf', f'Contents of page {i+1}/5', {'display': t, 'search': normalize(t)}) for i, t in enumerate(terms))
+        yield index
+
+
+def test_ngrams():
+    assert ngrams(normalize("Ab-c d")) == {"ab ", "b c", " c ", "c d"}
+
+
+@pytest.mark.parametrize("query,threshold", [
+    ("ipsum", 70),
+    ("ipsum conseteur", 70),
+    ("seeing eye", 90),
+    ("diam", 100),
+    ("xyz", 70),
+])
+@pytest.mark.parametrize("module", matcher_modules)
+def test_candidates(index, query, threshold, module):
+    matcher = Matcher.get_class(module)()
+    candidates = [item.term['search'] for item in index.candidates(query, threshold, matcher)]
+    searches = [normalize(t) for t in terms]
+    assert len(index) == len(terms)
+    assert candidates == [s for s in searches if s in candidates]
+    assert all(s in candidates for s in searches if matcher.score(s, normalize(query)) >= threshold)
+
+
+def test_update(index):
+    item = Item('/other.pdf', 'Metadata', {'display': 'seeing eye', 'search': 'seeing eye'})
+    assert index.update('/other.pdf', 'abc', [item]) == 1
+    assert index.key('/other.pdf') == 'abc'
+    assert index.prune(['/other.pdf']) == 0
+    assert len(index) == len(terms) + 1
+    index.update('/other.pdf', 'def', [])
+    index.compact()
+    assert len(index) == len(terms)
+    assert [i.path for i in index.candidates("seeing eye", 90, Matcher.get_class('all_seeing_eye.plugins.matcher.default_matcher')())] == ['/doc.pdf']
+
+
+def test_remove(index):
+    dfs = dict(index.db.execute("SELECT gram, df FROM grams"))
+    item = Item('/other.pdf', 'Metadata', {'display': 'seeing eye', 'search': 'seeing eye'})
+    for key in ('abc', 'def'):
+        index.update('/other.pdf', key, [item])
+    index.remove('/other.pdf')
+    assert dict(index.db.execute("SELECT gram, df FROM grams")) == dfs
+    assert index.stale == 2
+    assert not index.compact_stale(0.5)
+    assert index.compact_stale()
+    assert index.stale == 0
+    assert dict(index.db.execute("SELECT gram, df FROM grams")) == dfs
+
+
+@pytest.mark.parametrize("module", matcher_modules)
+def test_candidates_recall(tmp_path, module):
+    """
+    Every term a brute-force search matches is a candidate
+    """
+    rng = random.Random(0)
+    words = "lorem ipsum dolor sit amet et duo sea magna author invidunt sed diam".split()
+    texts = [" ".join(rng.choice(words) for _ in range(rng.randint(1, 8))) for _ in range(150)]
+    matcher = Matcher.get_class(module)()
+    pruned = 0
+    with Index(str(tmp_path / 'index.sqlite')) as index:
+        index.add(Item('/doc.pdf', str(i), {'display': t, 'search': normalize(t)}) for i, t in enumerate(texts))
+        for _ in range(60):
+            query = " ".join(rng.choice(words) for _ in range(rng.randint(1, 3)))
+            threshold = rng.choice([50, 70, 90, 100])
+            candidates = {item.where for item in index.candidates(query, threshold, matcher)}
+            expected = {str(i) for (i, t) in enumerate(texts) if matcher.score(normalize(t), normalize(query), threshold) >= threshold}
+            assert expected <= candidates, (query, threshold)
+            pruned += len(candidates) < len(texts)
+    # only the substring matcher has a bound
+    assert (pruned > 0) == module.endswith('default_matcher')
+
+
+def test_index_changes(corpus, tmp_path, capsys):
+    config = SearchConfig(directories=[str(corpus)], contents=True, cache_dir=str(tmp_path / 'cache'))
+    broken = corpus / 'copying.pdf'
+    broken.write_bytes(open(config.files[0], 'rb').read()[:100])
+    with Index(str(tmp_path / 'index.sqlite')) as idx:
+        (count, failed) = index_changes(idx, config, [str(broken)] + config.files, [])
+        assert count > 0 and failed == 1
+        assert idx.key(str(broken)) is None and all(idx.key(path) for path in config.files)
+    assert f"Could not index {broken}" in capsys.readouterr().err
@@ -1,8 +1,11 @@
+import random
 import pytest
+from all_seeing_eye.lib.normalize import normalize
 from all_seeing_eye.plugins.matcher.matcher import Matcher
 
 matcher_modules = [
     ('all_seeing_eye.plugins.matcher.fuzzywuzzy', Matcher),
+    ('all_seeing_eye.plugins.matcher.rapidfuzz', Matcher),
     # ('all_seeing_eye.plugins.matcher.default_matcher', Matcher),
 ]
 
@@ -24,4 +27,59 @@ lorem = ("Lorem ipsum dolor sit amet, consetetur sadipscing elitr, sed diam "
 ])
 def test_scorer(module, plugin, term, query, score_op):
     instance = plugin.get_class(module)()
-    assert score_op(instance.score(term, query))
+    assert score_op(instance.score(normalize(term), normalize(query)))
+
+
+@pytest.mark.parametrize("module,plugin", matcher_modules)
+@pytest.mark.parametrize("query", ["ipsum", "IPSUM", "ipum labore", "sadipscing elitr, sed diam nonumy eirmod"])
+def test_score_batch(module, plugin, query):
+    instance = plugin.get_class(module)()
+    terms = lorem.split(",") + [lorem, "", "ipsum"]
+    scores = instance.score_batch(terms, query)
+    assert list(scores) == [instance.score(term, query) for term in terms]
+
+
+@pytest.mark.parametrize("module,plugin", matcher_modules)
+def test_score_queries(module, plugin):
+    instance = plugin.get_class(module)()
+    terms = lorem.split(",") + [lorem, "", "ipsum"]
+    queries = [("ipsum", 0), ("IPSUM", 90), ("ipum labore", 60), ("sadipscing elitr, sed diam nonumy eirmod", 80)]
+    assert [list(scores) for scores in instance.score_queries(terms, queries)] == \
+        [list(instance.score_batch(terms, query, threshold)) for (query, threshold) in queries]
+
+
+def typos(rng, text):
+    chars = list(text)
+    for _ in range(rng.randint(0, 3)):
+        chars[rng.randrange(len(chars))] = rng.choice('abcdefghijklmnopqrstuvwxyz ')
+    return ''.join(chars)
+
+
+def pairs(n=300):
+    rng = random.Random(0)
+    words = lorem.replace(',', ' ').replace('.', ' ').split() + ['Ipsum', 'DOLOR', 'Grüße', 'seeing', 'eye']
+    for _ in range(n):
+        term = ' '.join(rng.choice(words) for _ in range(rng.randint(1, 12)))
+        query = typos(rng, ' '.join(rng.choice(words) for _ in range(rng.randint(1, 3))))
+        yield (term, query)
+    yield (lorem, lorem)
+    yield ('ipsum', 'ipsum')
+    yield ('', '')
+    yield ('ipsum', '')
+
+
+@pytest.mark.parametrize("module,plugin", matcher_modules)
+@pytest.mark.parametrize("threshold", [1, 50, 70, 90, 100])
+def test_threshold_is_exact(module, plugin, threshold):
+    instance = plugin.get_class(module)()
+    for (term, query) in pairs():
+        exact = instance.score(term, query)
+        for score in (instance.score(term, query, threshold), instance.score_batch([term], query, threshold)[0]):
+            assert score == exact or (score == 0 and exact < threshold), (term, query)
+
+
+def test_fuzzywuzzy_prefilter():
+    instance = Matcher.get_class('all_seeing_eye.plugins.matcher.fuzzywuzzy')()
+    rejected = [(term, query) for (term, query) in pairs() if not instance.may_reach(term, query, 70)]
+    assert len(rejected) > 50
+    assert all(instance.score(term, query) < 70 for (term, query) in rejected)
@@ -0,0 +1,42 @@
+import pytest
+from all_seeing_eye.ase import search, main, PdfSegments
+from all_seeing_eye.lib.app import SearchConfig
+from all_seeing_eye.lib.normalize import normalize
+
+
+@pytest.mark.parametrize("text,normalized", [
+    ("The  All-Seeing\tEye.", "the all seeing eye"),
+    ("Die \ufb01nale Analyse", "die finale analyse"),
+    ("Exam- ple of hyphen\u00adation", "example of hyphenation"),
+    ("Jean- Paul", "jean paul"),
+    ("Grüße aus ZÜRICH", "grüsse aus zürich"),
+    ("\uff30\uff24\uff26", "pdf"),
+    ("", ""),
+])
+def test_normalize(text, normalized):
+    assert normalize(text) == normalized
+    assert normalize(normalized) == normalized
+
+
+def test_search_form(corpus, tmp_path):
+    config = SearchConfig(directories=[str(corpus)], contents=True, cache_dir=str(tmp_path / 'cache'))
+    items = list(PdfSegments(config.files[0], config))
+    assert all(item.term['search'] == normalize(item.term['display']) for item in items)
+    assert list(PdfSegments(config.files[0], config)) == items
+
+
+def test_default_matcher_ignores_case(corpus, tmp_path):
+    config = SearchConfig(directories=[str(corpus)], contents=True, cache_dir=str(tmp_path / 'cache'),
+                          matcher_module='all_seeing_eye.plugins.matcher.default_matcher')
+    matches = search(config.files[0], config, "ALL Seeing-Eye", 100)
+    assert [m.item.where for m in matches] == ["Contents of page 1/2"]
+
+
+@pytest.mark.parametrize("query", ["!!!", " ", ""])
+def test_empty_query(corpus, tmp_path, query):
+    config = SearchConfig(directories=[str(corpus)], contents=True, cache_dir=str(tmp_path / 'cache'),
+                          matcher_module='all_seeing_eye.plugins.matcher.default_matcher')
+    with pytest.raises(ValueError):
+        search(config.files[0], config, query, 70)
+    with pytest.raises(SystemExit):
+        main([query, '-d', str(corpus), '--config', str(tmp_path / 'config.json')])
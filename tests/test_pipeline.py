@@ -0,0 +1,34 @@
+import threading
+import pytest
+from all_seeing_eye.ase import search
+from all_seeing_eye.lib.app import SearchConfig
+from all_seeing_eye.lib.pipeline import Pipeline
+
+
+@pytest.mark.parametrize('extractors, brk', [(1, False), (1, True), (2, False)])
+def test_pipeline(corpus, tmp_path, extractors, brk):
+    config = SearchConfig(directories=[str(corpus)], contents=True, cache_dir=str(tmp_path / 'cache'), chunk_pages=1)
+    pipeline = Pipeline(config, "Page two", 50, brk, prefetch=1, extractors=extractors, batches=1)
+    results = dict(pipeline.search(config.files))
+    assert results == {path: search(path, config, "Page two", 50, brk) for path in config.files}
+    if extractors == 1:
+        assert list(dict(pipeline.search(config.files))) == config.files
+
+
+def test_pipeline_close(corpus, tmp_path):
+    config = SearchConfig(directories=[str(corpus)], contents=True, cache_dir=str(tmp_path / 'cache'))
+    threads = set(threading.enumerate())
+    stages = Pipeline(config, "Page two", 50, prefetch=1, batches=1).search(config.files * 10)
+    next(stages)
+    stages.close()
+    # other tests may leave threads of their own
+    assert set(threading.enumerate()) <= threads
+
+
+def test_pipeline_error(corpus, tmp_path):
+    config = SearchConfig(directories=[str(corpus)], contents=True, cache_dir=str(tmp_path / 'cache'))
+    threads = set(threading.enumerate())
+    with pytest.raises(FileNotFoundError):
+        list(Pipeline(config, "Page two", 50).search(config.files + [str(corpus / 'missing.pdf')]))
+    # other tests may leave threads of their own
+    assert set(threading.enumerate()) <= threads
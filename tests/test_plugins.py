@@ -1,22 +1,28 @@
 import pytest
+from concurrent.futures import ThreadPoolExecutor
+from importlib.metadata import EntryPoint
+from all_seeing_eye import ase
+from all_seeing_eye.plugins import plugins
 from all_seeing_eye.plugins.matcher.matcher import Matcher
 from all_seeing_eye.plugins.pdf.pdf import Pdf
 from all_seeing_eye.plugins.segmentizer.segmentizer import Segmentizer
 from all_seeing_eye.plugins.tokenizer.tokenizer import Tokenizer
 from all_seeing_eye.plugins.ui.ui import Ui
+from all_seeing_eye.plugins.store.store import Store
 import inspect
 
 matcher_modules = [
     (None, Matcher),
     ('all_seeing_eye.plugins.matcher.fuzzywuzzy', Matcher),
     ('all_seeing_eye.plugins.matcher.default_matcher', Matcher),
+    ('all_seeing_eye.plugins.matcher.rapidfuzz', Matcher),
 ]
 
 pdf_modules = [
     (None, Pdf),
     ('all_seeing_eye.plugins.pdf.pdfplumber', Pdf),
-    # ('all_seeing_eye.plugins.pdf.fitz', Pdf),
-    # ('all_seeing_eye.plugins.pdf.PyPDF2', Pdf),
+    ('all_seeing_eye.plugins.pdf.fitz', Pdf),
+    ('all_seeing_eye.plugins.pdf.PyPDF2', Pdf),
 ]
 
 segmentizer_modules = [
@@ -29,6 +35,7 @@ tokenizer_modules = [
     (None, Tokenizer),
     ('all_seeing_eye.plugins.tokenizer.tokenize', Tokenizer),
     ('all_seeing_eye.plugins.tokenizer.default_tokenizer', Tokenizer),
+    ('all_seeing_eye.plugins.tokenizer.regex', Tokenizer),
 ]
 
 ui_modules = [
@@ -37,13 +44,46 @@ ui_modules = [
     ('all_seeing_eye.plugins.ui.rich', Ui),
 ]
 
+store_modules = [
+    (None, Store),
+    ('all_seeing_eye.plugins.store.directory', Store),
+    ('all_seeing_eye.plugins.store.sqlite', Store),
+]
+
 
-@pytest.mark.parametrize("module,plugin", matcher_modules + pdf_modules + segmentizer_modules + tokenizer_modules + ui_modules)
+@pytest.mark.parametrize("module,plugin", matcher_modules + pdf_modules + segmentizer_modules + tokenizer_modules + ui_modules + store_modules)
 def test_factory(module, plugin):
     instance = plugin.get_class(module)()
     assert isinstance(instance, plugin)
 
 
-@pytest.mark.parametrize("module,plugin", matcher_modules + pdf_modules + segmentizer_modules + tokenizer_modules + ui_modules)
+@pytest.mark.parametrize("module,plugin", matcher_modules + pdf_modules + segmentizer_modules + tokenizer_modules + ui_modules + store_modules)
 def test_factory_class(module, plugin):
     assert inspect.isclass(plugin.get_class(module))
+
+
+def test_get_class_resolves_once(monkeypatch):
+    cls = Matcher.get_class('all_seeing_eye.plugins.matcher.default_matcher')
+    monkeypatch.setattr(plugins, 'import_module', None)
+    assert Matcher.get_class('all_seeing_eye.plugins.matcher.default_matcher') is cls
+
+
+def test_entry_point(monkeypatch):
+    entry_point = EntryPoint('mine', 'all_seeing_eye.plugins.matcher.default_matcher:Default', 'all_seeing_eye.matcher')
+    monkeypatch.setitem(plugins.registry.groups, 'all_seeing_eye.matcher', {'mine': entry_point})
+    assert Matcher.get_class('mine') is Matcher.get_class('all_seeing_eye.plugins.matcher.default_matcher')
+    assert ase.plugin_module('matcher')('mine') == 'mine'
+    assert ase.plugin_module('matcher')('rapidfuzz') == 'all_seeing_eye.plugins.matcher.rapidfuzz'
+    with pytest.raises(Exception):
+        Pdf.get_class('mine')
+
+
+def test_instances():
+    module = 'all_seeing_eye.plugins.matcher.default_matcher'
+    shared = Matcher.get_instance(module)
+    assert shared is Matcher.get_instance(module)
+    assert shared is not Matcher.get_instance('all_seeing_eye.plugins.matcher.rapidfuzz')
+    assert Matcher.create(module) is not shared
+    with ThreadPoolExecutor(4) as pool:
+        others = list(pool.map(lambda _: Matcher.get_instance(module), range(4)))
+    assert all(other is shared for other in others)
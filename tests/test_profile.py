@@ -0,0 +1,57 @@
+import io
+import json
+import pickle
+import pytest
+from all_seeing_eye.ase import search, init_worker, search_worker
+from all_seeing_eye.lib.app import SearchConfig
+from all_seeing_eye.lib.profile import Profile, Site
+
+
+def test_site_percentiles():
+    site = Site(size=100)
+    for ms in range(1, 1001):
+        site.add(ms / 1000)
+    assert (site.calls, len(site.samples), site.slowest) == (1000, 100, 1.0)
+    assert site.percentile(50) < site.percentile(99) <= 1.0
+    other = Site(size=100)
+    other.add(2.0)
+    site.merge(other)
+    assert (site.calls, len(site.samples), site.slowest) == (1001, 100, 2.0)
+
+
+@pytest.mark.parametrize('segmentize', [False, True])
+def test_profile_search(corpus, tmp_path, segmentize):
+    config = SearchConfig(directories=[str(corpus)], contents=True, segmentize=segmentize,
+                          cache_dir=str(tmp_path / 'cache'), profile=True)
+    plain = SearchConfig(**{**config.settings(), 'profile': False, 'cache_dir': str(tmp_path / 'plain')})
+    expected = [search(path, plain, "Page two", 50) for path in config.files]
+    assert [search(path, config, "Page two", 50) for path in config.files] == expected
+    assert [search(path, config, "Page two", 50) for path in config.files] == expected
+
+    summary = config.stats.summary()
+    assert {'Pdf.get_page_text', 'Tokenizer.tokenize', 'Matcher.score_batch', 'PdfSegments', 'PdfDocument.load',
+            'PdfDocument.store'} <= set(summary['sites'])
+    assert summary['sites']['PdfSegments']['calls'] == 2 * len(config.files)
+    assert summary['caches']['chunks']['ratio'] == 0.5
+    assert ('Segmentizer.segment' in summary['sites']) == segmentize
+    assert [f['path'] for f in summary['slowest_files']] == sorted(config.files, key=lambda p: -config.stats.files[p])
+
+    handle = io.StringIO()
+    config.stats.write_json(handle)
+    assert json.loads(handle.getvalue()) == json.loads(json.dumps(summary))
+    handle = io.StringIO()
+    config.stats.write_table(handle)
+    assert 'Pdf.get_page_text' in handle.getvalue()
+
+
+def test_profile_worker(corpus, tmp_path):
+    config = SearchConfig(directories=[str(corpus)], contents=True, cache_dir=str(tmp_path / 'cache'), profile=True)
+    init_worker(config.settings(), "Page two", 50, False)
+    (matches, rest, stats) = pickle.loads(pickle.dumps(search_worker((config.files[0], 0, None))))
+    assert stats.sites['PdfSegments'].calls == 1
+    assert search_worker((config.files[0], 0, None))[2].sites['PdfSegments'].calls == 1
+    merged = Profile()
+    merged.merge(stats)
+    merged.merge(stats)
+    assert merged.sites['PdfSegments'].calls == 2
+    assert merged.caches['chunks'] == [0, 2 * stats.caches['chunks'][1]]
@@ -0,0 +1,62 @@
+import pytest
+from all_seeing_eye.lib import ranking
+from all_seeing_eye.lib.app import Item, Match
+from all_seeing_eye.lib.normalize import normalize
+from all_seeing_eye.lib.ranking import Ranking, aggregate, snippet
+
+
+def match(score, path, where, text):
+    return Match(score, Item(path, where, {'display': text, 'search': normalize(text)}))
+
+
+@pytest.fixture
+def matches():
+    header = "The All-Seeing Eye Handbook"
+    return [
+        match(95, '/single.pdf', 'Contents of page 2/9', "The all-seeing eye searches PDF files"),
+        match(90, '/many.pdf', 'Metadata', "All-seeing eye"),
+        *[match(90, '/many.pdf', f'Contents of page {i}/9', header) for i in range(1, 9)],
+        *[match(85 + i, '/many.pdf', f'Contents of page {i}/9', f"The eye sees {i} files") for i in range(1, 4)],
+        match(70, '/poor.pdf', 'Contents of page 1/1', "A seeing aid"),
+    ]
+
+
+@pytest.mark.parametrize("scores,expected", [
+    ([], 0),
+    ([80], 80),
+    ([100, 100], 100 + ranking.BONUS / (1 + ranking.K1)),
+    ([90, 100, 60], 100 + ranking.BONUS * 1.5 / (1.5 + ranking.K1)),
+])
+def test_aggregate(scores, expected):
+    assert aggregate(scores) == pytest.approx(expected)
+    assert aggregate(scores + [100] * 1000) < 100 + ranking.BONUS
+
+
+def test_ranking(matches):
+    documents = Ranking("seeing eye").add(matches).top()
+    assert [d.path for d in documents] == ['/many.pdf', '/single.pdf', '/poor.pdf']
+    many = documents[0]
+    # the header of every page is kept once, on the first page
+    assert many.duplicates == 7
+    assert sorted(many.pages, key=str) == [1, 2, 3, None]
+    assert [p.number for p in many.ranked_pages()] == [1, None, 3, 2]
+    assert many.ranked_pages()[0].best.item.term['display'] == "The All-Seeing Eye Handbook"
+    assert [d.path for d in Ranking("seeing eye").add(matches).top(1)] == ['/many.pdf']
+
+
+@pytest.mark.parametrize("text,query,width,expected", [
+    ("The all-seeing eye searches PDF files", "seeing eye", 160, "The all-*seeing* *eye* searches PDF files"),
+    ("Searching the eye", "search", 160, "*Searching* the eye"),
+    ("no match here", "seeing eye", 160, "no match here"),
+    ("a b c d e f g h i j k l m n o p q r s t u v w x y z eye a b c d e f g h", "eye", 24, "… x y z *eye* a b c d e f g …"),
+])
+def test_snippet(text, query, width, expected):
+    assert snippet(text, query, width) == expected
+
+
+def test_lines_build_snippets_lazily(matches, monkeypatch):
+    texts = []
+    monkeypatch.setattr(ranking, 'snippet', lambda text, *args: texts.append(text) or text)
+    lines = list(Ranking("seeing eye").add(matches).lines(1, pages=2))
+    assert lines[0].startswith('1. /many.pdf (')
+    assert len(lines) == 3 and texts == ["The All-Seeing Eye Handbook", "All-seeing eye"]
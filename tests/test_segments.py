@@ -0,0 +1,46 @@
+import random
+import pytest
+import wordsegment
+from concurrent.futures import ThreadPoolExecutor
+from all_seeing_eye.lib.segments import SegmentCache
+from all_seeing_eye.plugins.segmentizer.segmentizer import Segmentizer
+
+
+@pytest.fixture(scope='module')
+def segmentizer():
+    wordsegment.load()
+    return Segmentizer.get_class('all_seeing_eye.plugins.segmentizer.wordsegment')()
+
+
+def texts():
+    rng = random.Random(0)
+    with open(wordsegment.Segmenter.WORDS_FILENAME) as handle:
+        words = handle.read().split()[:2000]
+    # the longest text is segmented in chunks
+    return ['', 'a', 'thequickbrownfox', 'Hello World!', '/usr/local/share-data_file.pdf'] + \
+        [''.join(rng.choice(words) for _ in range(n)) for n in (10, 50)]
+
+
+@pytest.mark.parametrize('text', texts(), ids=range(7))
+def test_wordsegment(segmentizer, text):
+    assert segmentizer.words(text) == wordsegment.segment(text)
+
+
+def test_wordsegment_threads(segmentizer):
+    # one instance is shared by the threads of the pipeline
+    with ThreadPoolExecutor(4) as pool:
+        assert list(pool.map(segmentizer.words, texts() * 4)) == [wordsegment.segment(t) for t in texts() * 4]
+
+
+def test_segment_cache(segmentizer, tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(segmentizer, 'segment', lambda text: calls.append(text) or text.upper())
+    cache = SegmentCache(segmentizer, str(tmp_path), maxsize=1)
+    assert [cache.segment(t) for t in ['a', 'a', 'b', 'a']] == ['A', 'A', 'B', 'A']
+    assert calls == ['a', 'b']
+    cache.close()
+
+    cache = SegmentCache(segmentizer, str(tmp_path))
+    assert cache.segment('b') == 'B'
+    assert calls == ['a', 'b']
+    cache.close()
@@ -0,0 +1,30 @@
+import socket
+import threading
+import time
+import pytest
+from all_seeing_eye.lib import server
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='needs Unix sockets')
+
+
+def answer(request):
+    if request['query'] == 'fail':
+        raise ValueError('no')
+    return {'matches': [request['query'].upper()]}
+
+
+def test_request(tmp_path):
+    path = str(tmp_path / 'ase.sock')
+    assert not server.is_running(path)
+    with pytest.raises(OSError):
+        server.request(path, {'query': 'x'})
+
+    threading.Thread(target=server.serve, args=(path, answer), daemon=True).start()
+    while not server.is_running(path):
+        time.sleep(0.01)
+
+    assert server.request(path, {'query': 'eye'}) == {'matches': ['EYE']}
+    with pytest.raises(Exception, match='ValueError: no'):
+        server.request(path, {'query': 'fail'})
+    with pytest.raises(Exception, match='Another server'):
+        server.serve(path, answer)
@@ -0,0 +1,56 @@
+import os
+from multiprocessing import Pool
+import pytest
+from all_seeing_eye.ase import search, PdfDocument
+from all_seeing_eye.lib.app import Item, SearchConfig
+from all_seeing_eye.lib.columns import Columns
+from all_seeing_eye.plugins.store.store import Store
+
+store_modules = ['all_seeing_eye.plugins.store.directory', 'all_seeing_eye.plugins.store.sqlite']
+
+items = [
+    Item('/doc.pdf', 'Contents of page 1/2', {'display': 'Lorem ipsum', 'search': 'Lorem ipsum'}),
+    Item('/doc.pdf', 'Contents of page 2/2', {'display': 'dolor-sit', 'search': 'dolor sit'}),
+]
+
+
+@pytest.mark.parametrize('module', store_modules)
+def test_store(tmp_path, module):
+    store = Store.get_class(module)()
+    store.open(str(tmp_path), 'PdfDocument')
+    assert store.names('d1-x') == set() and store.load('d1-x', '0-2', '/doc.pdf') is None
+    for key in ('d1-x', 'd2-x'):
+        fname = store.temp_name(key, '0-2')
+        Columns.dump(items, fname)
+        store.save(key, '0-2', fname)
+        assert not os.path.exists(fname)
+    assert store.names('d1-x') == {'0-2'}
+    columns = store.load('d1-x', '0-2', '/moved.pdf')
+    assert list(columns) == [Item('/moved.pdf', i.where, i.term) for i in items]
+    columns.close()
+
+    store.collect_garbage({'d2'})
+    assert store.names('d1-x') == set() and store.names('d2-x') == {'0-2'}
+    store.close()
+
+
+def search_files(settings):
+    config = SearchConfig(**settings)
+    return [search(path, config, "Page two", 50) for path in config.files]
+
+
+@pytest.mark.parametrize('module', store_modules)
+def test_shared_store(corpus, tmp_path, module):
+    config = SearchConfig(directories=[str(corpus)], contents=True, cache_dir=str(tmp_path / 'cache'),
+                          chunk_pages=1, store_module=module)
+    expected = search_files({**config.settings(), 'cache_dir': None})
+    with Pool(4) as pool:
+        assert pool.map(search_files, [config.settings()] * 8) == [expected] * 8
+    assert all(PdfDocument(path, config).cached for path in config.files)
+    assert search_files(config.settings()) == expected
+
+    keys = [PdfDocument(path, config).key for path in config.files]
+    for path in config.files:
+        os.remove(path)
+    PdfDocument.collect_garbage(config)
+    assert [config.store.names(key) for key in keys] == [set() for key in keys]
@@ -0,0 +1,61 @@
+import pytest
+from all_seeing_eye.lib.app import SearchConfig
+from all_seeing_eye.plugins.tokenizer.tokenizer import Tokenizer
+
+
+@pytest.fixture(scope='module')
+def tokenizer():
+    return Tokenizer.get_class('all_seeing_eye.plugins.tokenizer.regex')()
+
+
+# the texts, their sentences and their language, shared with the Punkt comparison
+SENTENCES = [
+    ("", [], 'english'),
+    ("  No period at the end ", ["No period at the end"], 'english'),
+    ("Dr. Smith went to Washington. He arrived at 3.30 p.m. on Monday. Was it late? Yes!",
+     ["Dr. Smith went to Washington.", "He arrived at 3.30 p.m. on Monday.", "Was it late?", "Yes!"], 'english'),
+    ("See Fig. 3 and Eq. 2. The results (cf. Tab. 1) are good. Prof. J. K. Rowling agrees, e.g. in chapter 3.",
+     ["See Fig. 3 and Eq. 2.", "The results (cf. Tab. 1) are good.", "Prof. J. K. Rowling agrees, e.g. in chapter 3."], 'english'),
+    ('He said "Stop." Then he left... The value is 3.14. Versions 1.2 and 1.3 exist.',
+     ['He said "Stop."', 'Then he left...', 'The value is 3.14.', 'Versions 1.2 and 1.3 exist.'], 'english'),
+    ("Die Sitzung findet am 3. Oktober statt. Siehe z.B. Abb. 4 und S. 12. Danach folgt Kap. 3. Das Ende naht.",
+     ["Die Sitzung findet am 3. Oktober statt.", "Siehe z.B. Abb. 4 und S. 12.", "Danach folgt Kap. 3.", "Das Ende naht."], 'german'),
+    ("Er kam ca. um 8 Uhr, bzw. etwas später. „Gut.“ Es gab Äpfel usw. und Nüsse. Übrigens: Nr. 5 fehlt.",
+     ["Er kam ca. um 8 Uhr, bzw. etwas später.", "„Gut.“", "Es gab Äpfel usw. und Nüsse.", "Übrigens: Nr. 5 fehlt."], 'german'),
+    ("The run took 5 ms. Then it stopped. Ms. Smith waited 2.5 ms. It took max. 3 tries and 10 min. Done.",
+     ["The run took 5 ms.", "Then it stopped.", "Ms. Smith waited 2.5 ms.", "It took max. 3 tries and 10 min.", "Done."], 'english'),
+]
+
+
+@pytest.mark.parametrize("text,sentences,language", SENTENCES)
+def test_regex(tokenizer, text, sentences, language):
+    assert tokenizer.tokenize(text) == sentences
+
+
+def test_nltk(tokenizer):
+    """
+    The regex tokenizer splits the corpus at least as well as Punkt
+    """
+    tokenize = pytest.importorskip('nltk.tokenize')
+    try:
+        tokenize.sent_tokenize('One. Two.')
+        tokenize.sent_tokenize('Eins. Zwei.', language='german')
+    except LookupError:
+        pytest.skip('the Punkt data of nltk is not installed')
+    punkt = sum(tokenize.sent_tokenize(text, language=language) == sentences for (text, sentences, language) in SENTENCES)
+    regex = sum(tokenizer.tokenize(text) == sentences for (text, sentences, language) in SENTENCES)
+    assert regex >= punkt
+
+
+def test_tokenize_many(tokenizer):
+    pages = ["One. Two.", "", "Three"]
+    assert tokenizer.tokenize_many(pages) == [["One.", "Two."], [], ["Three"]]
+
+
+def test_config():
+    config = SearchConfig(tokenize=True, cache_dir=None)
+    assert config.tokenizer.tokenize("One. Two.") == ["One.", "Two."]
+    assert SearchConfig(cache_dir=None).tokenizer.tokenize("One. Two.") == ["One", " Two", ""]
+    # the caches of other tokenizers are not used
+    nltk = SearchConfig(tokenize=True, cache_dir=None, tokenizer_module='all_seeing_eye.plugins.tokenizer.tokenize')
+    assert config.extraction_hash != nltk.extraction_hash
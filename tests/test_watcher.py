@@ -0,0 +1,24 @@
+import os
+import sys
+import pytest
+from all_seeing_eye.lib.watcher import Watcher
+
+
+@pytest.mark.parametrize("polling", [True, False])
+def test_batches(tmp_path, polling):
+    (tmp_path / 'old.pdf').write_bytes(b'old')
+    (tmp_path / 'gone.pdf').write_bytes(b'gone')
+    watcher = Watcher([str(tmp_path)], debounce=0.2, interval=0.05, polling=polling)
+    assert (watcher.inotify is None) == (polling or not sys.platform.startswith('linux'))
+    assert set(watcher.known) == {str(tmp_path / 'old.pdf'), str(tmp_path / 'gone.pdf')}
+
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'sub' / 'new.pdf').write_bytes(b'new')
+    (tmp_path / 'notes.txt').write_bytes(b'ignored')
+    (tmp_path / 'old.pdf').write_bytes(b'changed')
+    os.remove(tmp_path / 'gone.pdf')
+
+    (changed, deleted) = next(watcher.batches())
+    assert changed == {str(tmp_path / 'old.pdf'), str(tmp_path / 'sub' / 'new.pdf')}
+    assert deleted == {str(tmp_path / 'gone.pdf')}
+    watcher.close()